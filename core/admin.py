@@ -1,12 +1,12 @@
 from django.contrib import admin
-from .models import PortfolioRequest, PortfolioTemplate, PremiumWaitlist, Visitor, UserProfile
+from .models import PortfolioRequest, PortfolioTemplate, PremiumWaitlist, Visitor, UserProfile, ExtractionCacheEntry, DailyVisitStat, GeminiQuotaState, PortfolioDataEntry
 
 
 @admin.register(PortfolioRequest)
 class PortfolioRequestAdmin(admin.ModelAdmin):
-    list_display = ['id', 'created_at', 'has_extracted_data']
-    list_filter = ['created_at']
-    readonly_fields = ['created_at', 'updated_at']
+    list_display = ['id', 'user', 'status', 'attempts', 'created_at', 'has_extracted_data']
+    list_filter = ['status', 'created_at']
+    readonly_fields = ['created_at', 'updated_at', 'started_at', 'finished_at']
     
     def has_extracted_data(self, obj):
         return obj.extracted_data is not None
@@ -41,3 +41,33 @@ class UserProfileAdmin(admin.ModelAdmin):
     def gemini_api_key_set(self, obj):
         return bool(obj.gemini_api_key)
     gemini_api_key_set.boolean = True
+
+
+@admin.register(ExtractionCacheEntry)
+class ExtractionCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ['content_hash', 'prompt_version', 'hit_count', 'created_at', 'last_used_at']
+    list_filter = ['prompt_version']
+    search_fields = ['content_hash']
+    readonly_fields = ['created_at']
+
+
+@admin.register(PortfolioDataEntry)
+class PortfolioDataEntryAdmin(admin.ModelAdmin):
+    list_display = ['key', 'payload_size', 'created_at', 'last_used_at']
+    search_fields = ['key']
+    exclude = ['payload']
+
+    def payload_size(self, obj):
+        return len(obj.payload)
+    payload_size.short_description = 'Compressed bytes'
+
+@admin.register(DailyVisitStat)
+class DailyVisitStatAdmin(admin.ModelAdmin):
+    list_display = ['date', 'path', 'visits', 'unique_visitors']
+    list_filter = ['date']
+    search_fields = ['path']
+
+@admin.register(GeminiQuotaState)
+class GeminiQuotaStateAdmin(admin.ModelAdmin):
+    list_display = ['key_fingerprint', 'tokens', 'consecutive_failures', 'open_until', 'refilled_at']
+    search_fields = ['key_fingerprint']
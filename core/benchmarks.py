@@ -0,0 +1,237 @@
+"""
+Micro-benchmarks for the request hot paths.
+
+Each benchmark times one operation repeatedly (after a warm-up) and
+reports per-call statistics in milliseconds. Results are plain dicts so
+they can be saved as JSON and compared against a baseline run with
+compare_results; `manage.py benchmark` wraps both.
+"""
+import contextlib
+import io
+import json
+import os
+import platform
+import time
+from datetime import datetime, timezone as dt_timezone
+from importlib import import_module
+
+import django
+from django.conf import settings
+from django.http import HttpResponse
+from django.template import Context
+from django.test import RequestFactory, override_settings
+
+from . import middleware, portfolio_store, rendering
+from .loadtest import make_resume_pdf, percentile
+from .packaging import portfolio_zip_entries, stream_zip
+from .schema import PORTFOLIO_SCHEMA, example
+from .utils import extract_text_from_pdf
+
+PDF_PAGE_COUNTS = [1, 5, 20, 50]
+
+
+def sample_portfolio_data():
+    """Portfolio data of a typical size: the schema example with several entries per list"""
+    data = example(PORTFOLIO_SCHEMA)
+    data['skills'] = [f'skill{i}' for i in range(15)]
+    data['experience'] = data['experience'] * 5
+    data['projects'] = data['projects'] * 4
+    data['education'] = data['education'] * 2
+    return data
+
+
+def measure(func, min_iterations=5, min_time=0.5, max_iterations=1000, warmup=1):
+    """
+    Time repeated calls of `func`
+
+    Runs at least `min_iterations` calls and keeps going until `min_time`
+    seconds have been spent (up to `max_iterations`). Output printed by
+    the code under test is discarded.
+
+    Returns:
+        dict: iterations and min/mean/p50/p95/max in milliseconds
+    """
+    durations = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(warmup):
+            func()
+        started = time.perf_counter()
+        while len(durations) < max_iterations and (
+            len(durations) < min_iterations or time.perf_counter() - started < min_time
+        ):
+            call_started = time.perf_counter()
+            func()
+            durations.append(time.perf_counter() - call_started)
+
+    return {
+        'iterations': len(durations),
+        'min_ms': min(durations) * 1000,
+        'mean_ms': sum(durations) / len(durations) * 1000,
+        'p50_ms': percentile(durations, 50) * 1000,
+        'p95_ms': percentile(durations, 95) * 1000,
+        'max_ms': max(durations) * 1000,
+    }
+
+
+def _pdf_benchmarks():
+    for pages in PDF_PAGE_COUNTS:
+        pdf = make_resume_pdf('benchmark', pages)
+        yield f'pdf_extract_{pages}p', lambda pdf=pdf: extract_text_from_pdf(io.BytesIO(pdf))
+
+
+def _template_benchmarks(data):
+    for slug in sorted(os.listdir(rendering.PORTFOLIO_TEMPLATES_DIR)):
+        if not os.path.isfile(os.path.join(rendering.portfolio_template_dir(slug), 'index.html')):
+            continue
+
+        def compile_template(slug=slug):
+            rendering._compiled_templates.pop(slug, None)
+            rendering.get_portfolio_template(slug)
+
+        compiled = rendering.get_portfolio_template(slug)
+        html = compiled.template.render(Context(data))
+        yield f'template_compile_{slug}', compile_template
+        # Straight template rendering, bypassing the rendered-HTML cache
+        yield f'template_render_{slug}', lambda compiled=compiled: compiled.template.render(Context(data))
+        yield f'zip_build_{slug}', lambda slug=slug, html=html: b''.join(
+            stream_zip(portfolio_zip_entries(slug, html))
+        )
+
+
+def _session_benchmarks(data):
+    session_store = import_module(settings.SESSION_ENGINE).SessionStore
+
+    def encode():
+        session = session_store()
+        portfolio_store.save_to_session(session, data)
+        session.save()
+        return session.session_key
+
+    session_key = encode()
+
+    def decode():
+        return portfolio_store.load_from_session(session_store(session_key=session_key))
+
+    def decode_uncached():
+        portfolio_store.clear_local_cache()
+        return decode()
+
+    yield 'session_encode', encode
+    yield 'session_decode', decode
+    # Another process (or instance) reading the data from the store backend
+    yield 'session_decode_uncached', decode_uncached
+
+
+class _DiscardingVisitBuffer(middleware.VisitBuffer):
+    """Queues visits like the real buffer but never writes them"""
+
+    def flush(self):
+        with self._lock:
+            self._visits.clear()
+        return 0
+
+
+@contextlib.contextmanager
+def _isolated_visit_buffer():
+    real_buffer = middleware.visit_buffer
+    middleware.visit_buffer = _DiscardingVisitBuffer(max_size=10000, flush_size=10000, flush_interval=3600)
+    try:
+        yield
+    finally:
+        middleware.visit_buffer.flush()
+        middleware.visit_buffer = real_buffer
+
+
+def _middleware_benchmarks():
+    factory = RequestFactory()
+
+    def view(request):
+        return HttpResponse('ok')
+
+    def run(tracker, path):
+        request = factory.get(path, HTTP_USER_AGENT='benchmark', REMOTE_ADDR='127.0.0.1')
+        request.session = None
+        return tracker(request)
+
+    with override_settings(VISITOR_TRACKING_SAMPLE_RATE=1.0):
+        tracker = middleware.VisitorTrackingMiddleware(view)
+    yield 'middleware_baseline', lambda: run(view, '/')
+    yield 'middleware_visitor_tracking', lambda: run(tracker, '/')
+    yield 'middleware_visitor_excluded', lambda: run(tracker, '/static/app.css')
+
+
+def run_benchmarks(quick=False, only=None):
+    """
+    Run the benchmark suite
+
+    Args:
+        quick: Fewer iterations, for a fast sanity check
+        only: Optional substring; run only benchmarks whose name contains it
+
+    Returns:
+        dict: `meta` (environment) and `results` (name -> statistics)
+    """
+    options = {'min_iterations': 3, 'min_time': 0.1} if quick else {'min_iterations': 10, 'min_time': 1.0}
+    data = sample_portfolio_data()
+
+    results = {}
+    with _isolated_visit_buffer():
+        suites = [_pdf_benchmarks(), _template_benchmarks(data), _session_benchmarks(data), _middleware_benchmarks()]
+        for suite in suites:
+            for name, func in suite:
+                if only and only not in name:
+                    continue
+                results[name] = measure(func, **options)
+
+    return {
+        'meta': {
+            'created_at': datetime.now(dt_timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'quick': quick,
+        },
+        'results': results,
+    }
+
+
+def compare_results(baseline, current, threshold=0.2, metric='p50_ms'):
+    """
+    Compare two benchmark runs
+
+    Args:
+        baseline: Results dict from an earlier run
+        current: Results dict from this run
+        threshold: Relative slowdown (0.2 = 20%) counted as a regression
+        metric: Statistic to compare
+
+    Returns:
+        list: One dict per benchmark in both runs with `name`, `baseline`,
+            `current`, `change` (relative) and `regression`
+    """
+    rows = []
+    for name, stats in current['results'].items():
+        base_stats = baseline['results'].get(name)
+        if base_stats is None:
+            continue
+        base_value, value = base_stats[metric], stats[metric]
+        change = (value - base_value) / base_value if base_value else 0.0
+        rows.append({
+            'name': name,
+            'baseline': base_value,
+            'current': value,
+            'change': change,
+            'regression': change > threshold,
+        })
+    return rows
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_results(results, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
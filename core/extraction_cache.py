@@ -0,0 +1,129 @@
+"""
+Content-addressed cache for Gemini extraction results.
+
+Entries are keyed by a SHA-256 of the prompt version plus the normalized
+resume text, so the same resume uploaded again (by anyone) skips the LLM
+round trip. Entries expire after EXTRACTION_CACHE_TTL seconds and the table
+is trimmed to EXTRACTION_CACHE_MAX_ENTRIES, least recently used first.
+"""
+import hashlib
+import re
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ExtractionCacheEntry
+
+_stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+_stats_lock = threading.Lock()
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def _bump(counter, amount=1):
+    with _stats_lock:
+        _stats[counter] += amount
+
+
+def normalize_text(text):
+    """Collapse whitespace so cosmetic extraction differences hash the same"""
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+def content_key(text, prompt_version):
+    """Return the cache key for a resume text and prompt version"""
+    payload = f"{prompt_version}\0{normalize_text(text)}".encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+
+def get_cached_portfolio_data(text, prompt_version):
+    """
+    Look up a previous extraction result
+
+    Returns:
+        dict or None: Cached portfolio data, or None on a miss
+    """
+    if not settings.EXTRACTION_CACHE_ENABLED:
+        return None
+
+    key = content_key(text, prompt_version)
+    try:
+        entry = ExtractionCacheEntry.objects.filter(content_hash=key).first()
+        if entry is not None and entry.created_at < _expiry_cutoff():
+            entry.delete()
+            entry = None
+
+        if entry is None:
+            _bump('misses')
+            return None
+
+        ExtractionCacheEntry.objects.filter(pk=entry.pk).update(
+            hit_count=F('hit_count') + 1,
+            last_used_at=timezone.now(),
+        )
+    except DatabaseError as e:
+        # Cache table missing (e.g. migrations not run yet) - behave as a miss
+        print(f"DEBUG: Extraction cache unavailable: {e}")
+        _bump('misses')
+        return None
+
+    _bump('hits')
+    print(f"DEBUG: Extraction cache hit for {key[:12]}")
+    return entry.data
+
+
+def store_portfolio_data(text, prompt_version, data):
+    """Save an extraction result and evict stale entries"""
+    if not settings.EXTRACTION_CACHE_ENABLED:
+        return
+
+    key = content_key(text, prompt_version)
+    try:
+        ExtractionCacheEntry.objects.update_or_create(
+            content_hash=key,
+            defaults={
+                'prompt_version': prompt_version,
+                'data': data,
+                'last_used_at': timezone.now(),
+            },
+        )
+        _bump('stores')
+        evict()
+    except DatabaseError as e:
+        print(f"DEBUG: Could not store extraction cache entry: {e}")
+
+
+def evict():
+    """Delete expired entries, then the least recently used ones over the size limit"""
+    removed, _ = ExtractionCacheEntry.objects.filter(created_at__lt=_expiry_cutoff()).delete()
+
+    max_entries = settings.EXTRACTION_CACHE_MAX_ENTRIES
+    overflow = ExtractionCacheEntry.objects.count() - max_entries
+    if overflow > 0:
+        stale_ids = list(
+            ExtractionCacheEntry.objects.order_by('last_used_at')
+            .values_list('pk', flat=True)[:overflow]
+        )
+        extra, _ = ExtractionCacheEntry.objects.filter(pk__in=stale_ids).delete()
+        removed += extra
+
+    if removed:
+        _bump('evictions', removed)
+    return removed
+
+
+def cache_stats():
+    """Return this process's hit/miss counters"""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
+
+
+def _expiry_cutoff():
+    return timezone.now() - timedelta(seconds=settings.EXTRACTION_CACHE_TTL)
@@ -0,0 +1,106 @@
+"""
+Firebase Admin SDK, loaded on first use, and cached ID token verification.
+
+Importing firebase_admin (and google.auth with it) takes over 100ms, which
+every serverless cold start used to pay while loading settings, even for
+pages that never verify a token. The SDK is now imported and the app
+initialized the first time a token has to be verified.
+
+verify_id_token() verifies tokens with the SDK and remembers the decoded
+claims (by a hash of the token) until the token expires, so repeat logins
+with the same token skip verification.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+_lock = threading.Lock()
+_initialized = False
+
+_tokens = OrderedDict()
+_tokens_lock = threading.Lock()
+
+
+def _credentials():
+    from firebase_admin import credentials
+
+    if os.path.exists(settings.FIREBASE_CREDENTIALS_PATH):
+        return credentials.Certificate(settings.FIREBASE_CREDENTIALS_PATH)
+    # Fallback for Vercel: Read from Environment Variable
+    json_config = os.environ.get('FIREBASE_CREDENTIALS_JSON')
+    if json_config:
+        return credentials.Certificate(json.loads(json_config))
+    print("Warning: Firebase credentials not found (File or Env Var)")
+    return None
+
+
+def ensure_firebase_app():
+    """Initialize the Firebase Admin app if that hasn't been tried yet in this process"""
+    global _initialized
+    if _initialized:
+        return
+    with _lock:
+        if _initialized:
+            return
+        try:
+            import firebase_admin
+
+            cred = _credentials()
+            if cred and not firebase_admin._apps:
+                firebase_admin.initialize_app(cred)
+        except ImportError:
+            print("Firebase Admin SDK not installed.")
+        except Exception as e:
+            print(f"Error initializing Firebase: {e}")
+        _initialized = True
+
+
+def _cached_claims(token_hash):
+    with _tokens_lock:
+        entry = _tokens.get(token_hash)
+        if entry is None:
+            return None
+        claims, expires_at = entry
+        if time.time() >= expires_at:
+            del _tokens[token_hash]
+            return None
+        _tokens.move_to_end(token_hash)
+        return dict(claims)
+
+
+def _remember_claims(token_hash, claims):
+    size = settings.FIREBASE_TOKEN_CACHE_SIZE
+    if size <= 0 or not claims.get('exp'):
+        return
+    with _tokens_lock:
+        _tokens[token_hash] = (dict(claims), claims['exp'])
+        _tokens.move_to_end(token_hash)
+        while len(_tokens) > size:
+            _tokens.popitem(last=False)
+
+
+def verify_id_token(id_token):
+    """
+    Verify a Firebase ID token with the Admin SDK, or return the claims
+    from when this token was last verified if it hasn't expired since
+
+    Returns:
+        dict: The decoded token claims
+
+    Raises:
+        ValueError: The token is invalid or expired
+    """
+    token_hash = hashlib.sha256(id_token.encode('utf-8')).hexdigest()
+    claims = _cached_claims(token_hash)
+    if claims is None:
+        ensure_firebase_app()
+        from firebase_admin import auth
+
+        claims = auth.verify_id_token(id_token)
+        _remember_claims(token_hash, claims)
+    return claims
@@ -0,0 +1,152 @@
+"""
+Per-API-key Gemini clients.
+
+genai.configure() swaps a process-wide default client, so two threads
+using different user keys can end up sending a request with the other
+user's key, and every call used to pay for a new client and connection.
+Instead each key gets its own GenerativeServiceClient, kept in a bounded
+LRU so its connection is reused across requests. Keys that haven't been
+used for GEMINI_CLIENT_IDLE_TIMEOUT seconds are dropped. Requests are
+built with build_request() and sent through the client's own
+generate_content / stream_generate_content methods.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+DEFAULT_MODEL = 'gemini-flash-latest'
+
+_clients = OrderedDict()
+_lock = threading.Lock()
+_pid = os.getpid()
+
+
+def key_fingerprint(api_key):
+    """Stable, non-reversible identifier for an API key (safe to log and store)"""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+
+
+def mask_key(api_key):
+    return f"{api_key[:4]}...{api_key[-4:]}" if len(api_key) > 8 else "****"
+
+
+def _make_client(api_key):
+    from google.ai import generativelanguage as glm
+    from google.api_core import client_options as client_options_lib
+    from google.api_core import gapic_v1
+    from google.generativeai import __version__ as genai_version
+
+    return glm.GenerativeServiceClient(
+        client_options=client_options_lib.ClientOptions(api_key=api_key),
+        client_info=gapic_v1.client_info.ClientInfo(user_agent=f'genai-py/{genai_version}'),
+    )
+
+
+def _evict_idle(now):
+    # Entries are kept in least-recently-used order
+    while _clients:
+        fingerprint, (client, last_used) = next(iter(_clients.items()))
+        if now - last_used < settings.GEMINI_CLIENT_IDLE_TIMEOUT:
+            break
+        del _clients[fingerprint]
+    # Evicted clients aren't closed explicitly: a thread may still be using
+    # one, and its channel is closed once the last reference is gone
+
+
+def _reset_after_fork():
+    global _pid
+    if os.getpid() != _pid:
+        # Connections can't be shared with a forked parent
+        _clients.clear()
+        _pid = os.getpid()
+
+
+def get_client(api_key):
+    """Return the shared client for `api_key`, creating it if needed"""
+    fingerprint = key_fingerprint(api_key)
+    with _lock:
+        _reset_after_fork()
+        _evict_idle(time.monotonic())
+        entry = _clients.get(fingerprint)
+        if entry:
+            _clients[fingerprint] = (entry[0], time.monotonic())
+            _clients.move_to_end(fingerprint)
+            return entry[0]
+
+    # Built outside the lock so other keys aren't held up
+    print(f"DEBUG: Creating Gemini client for key: {mask_key(api_key)}")
+    client = _make_client(api_key)
+
+    with _lock:
+        entry = _clients.get(fingerprint)
+        if entry:
+            # Another thread created one meanwhile; use that one
+            client = entry[0]
+        _clients[fingerprint] = (client, time.monotonic())
+        _clients.move_to_end(fingerprint)
+        while len(_clients) > settings.GEMINI_CLIENT_POOL_SIZE:
+            _clients.popitem(last=False)
+    return client
+
+
+def glm_schema(schema):
+    """Convert a schema from core.schema.response_schema() to a generativelanguage Schema dict"""
+    converted = {'type_': schema['type'].upper()}
+    if 'properties' in schema:
+        converted['properties'] = {key: glm_schema(value) for key, value in schema['properties'].items()}
+    if 'required' in schema:
+        converted['required'] = list(schema['required'])
+    if 'items' in schema:
+        converted['items'] = glm_schema(schema['items'])
+    return converted
+
+
+def build_request(prompt, response_schema=None, model_name=DEFAULT_MODEL):
+    """
+    A GenerateContentRequest for a single text prompt
+
+    Requests go straight to the pooled GenerativeServiceClient, so nothing
+    depends on GenerativeModel internals.
+
+    Args:
+        prompt: Prompt text
+        response_schema: If given, ask for JSON matching this schema (see core.schema.response_schema)
+        model_name: Gemini model to use
+    """
+    from google.ai import generativelanguage as glm
+
+    generation_config = None
+    if response_schema is not None:
+        generation_config = glm.GenerationConfig(
+            response_mime_type='application/json',
+            response_schema=glm_schema(response_schema),
+        )
+    return glm.GenerateContentRequest(
+        model=model_name if model_name.startswith('models/') else f'models/{model_name}',
+        contents=[glm.Content(parts=[glm.Part(text=prompt)])],
+        generation_config=generation_config,
+    )
+
+
+def response_text(response):
+    """
+    Text of a GenerateContentResponse (or streamed chunk)
+
+    Raises:
+        ValueError: It has no text (blocked, or a chunk with only a finish reason)
+    """
+    if not response.candidates:
+        raise ValueError(f"Gemini returned no candidates: {response.prompt_feedback}")
+    candidate = response.candidates[0]
+    if not candidate.content.parts:
+        raise ValueError(f"Gemini returned no text (finish reason {candidate.finish_reason.name})")
+    return ''.join(part.text for part in candidate.content.parts)
+
+
+def clear_clients():
+    with _lock:
+        _clients.clear()
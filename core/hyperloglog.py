@@ -0,0 +1,109 @@
+"""
+HyperLogLog cardinality estimation.
+
+A sketch keeps 2**precision one-byte registers. Adding a value hashes it
+to 64 bits, uses the top `precision` bits to pick a register and stores
+the longest run of leading zeros seen in the remaining bits. Memory is
+constant (4KB at the default precision) no matter how many values are
+added, two sketches merge by taking the register-wise maximum, and the
+relative standard error of count() is about 1.04 / sqrt(2**precision):
+~1.6% at precision 12, so ~95% of estimates fall within ±3.3%.
+"""
+import hashlib
+import math
+import zlib
+
+DEFAULT_PRECISION = 12
+MIN_PRECISION = 4
+MAX_PRECISION = 16
+
+_HASH_BITS = 64
+_POWERS_OF_TWO = [2.0 ** -rank for rank in range(_HASH_BITS + 2)]
+
+
+def _hash64(value):
+    digest = hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class HyperLogLog:
+    """Mergeable, constant-memory estimate of the number of distinct values added"""
+
+    def __init__(self, precision=DEFAULT_PRECISION, registers=None):
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(f"precision must be between {MIN_PRECISION} and {MAX_PRECISION}")
+        self.precision = precision
+        self.size = 1 << precision
+        if registers is None:
+            self.registers = bytearray(self.size)
+        else:
+            if len(registers) != self.size:
+                raise ValueError("Register count does not match precision")
+            self.registers = bytearray(registers)
+
+    @property
+    def error_rate(self):
+        """Relative standard error of count()"""
+        return 1.04 / math.sqrt(self.size)
+
+    def add(self, value):
+        """Add a value (anything with a stable str())"""
+        hashed = _hash64(value)
+        remaining_bits = _HASH_BITS - self.precision
+        index = hashed >> remaining_bits
+        rest = hashed & ((1 << remaining_bits) - 1)
+        rank = remaining_bits - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+
+    def count(self):
+        """Estimated number of distinct values added"""
+        registers = self.registers
+        top = max(registers)
+        # bytearray.count runs in C, so build a histogram of register values
+        histogram = [registers.count(rank) for rank in range(top + 1)]
+        harmonic_sum = sum(_POWERS_OF_TWO[rank] * hits for rank, hits in enumerate(histogram))
+
+        m = self.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / harmonic_sum
+
+        zeros = histogram[0]
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction: linear counting
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def merge(self, other):
+        """Fold another sketch of the same precision into this one"""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches with different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    @classmethod
+    def union(cls, sketches, precision=DEFAULT_PRECISION):
+        """A new sketch covering everything in `sketches`"""
+        sketches = list(sketches)
+        if any(sketch.precision != precision for sketch in sketches):
+            raise ValueError("Cannot merge sketches with different precision")
+        if len(sketches) < 2:
+            return cls(precision, sketches[0].registers if sketches else None)
+        # One pass over all register arrays is much faster than pairwise merges
+        return cls(precision, bytearray(map(max, *(sketch.registers for sketch in sketches))))
+
+    def to_bytes(self):
+        """Compact serialization: a precision byte followed by zlib-compressed registers"""
+        return bytes([self.precision]) + zlib.compress(bytes(self.registers))
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = bytes(data)
+        return cls(data[0], zlib.decompress(data[1:]))
+
+    def __len__(self):
+        return self.count()
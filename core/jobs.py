@@ -0,0 +1,148 @@
+"""
+DB-backed queue for resume processing.
+
+upload_resume stores the PDF on a PortfolioRequest row in the `pending`
+state; `manage.py run_worker` claims rows one at a time with a conditional
+UPDATE (so several worker processes never pick the same job), runs text
+extraction and the Gemini call, and records the result on the row. The
+Gemini response is streamed, and each top-level field is saved to
+`partial_data` as soon as it is complete; the browser polls job_status,
+which returns the partial fields until the job has finished (or follows
+them over server-sent events from job_events when
+RESUME_JOB_EVENTS_ENABLED is set).
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import PortfolioRequest
+from .utils import parse_resume_with_gemini
+
+
+def enqueue_resume(user, resume_file):
+    """Persist an uploaded resume as a pending job"""
+    return PortfolioRequest.objects.create(
+        user=user,
+        resume_file=resume_file,
+        status=PortfolioRequest.STATUS_PENDING,
+    )
+
+
+def _claimable():
+    # Jobs left in `processing` by a crashed worker are picked up again
+    stale_cutoff = timezone.now() - timedelta(seconds=settings.RESUME_JOB_TIMEOUT)
+    return Q(status=PortfolioRequest.STATUS_PENDING) | Q(
+        status=PortfolioRequest.STATUS_PROCESSING,
+        started_at__lt=stale_cutoff,
+    )
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest claimable job to `processing`
+
+    Returns:
+        PortfolioRequest or None: The claimed job, or None if the queue is empty
+    """
+    candidates = (
+        PortfolioRequest.objects.filter(_claimable())
+        .order_by('created_at')
+        .values_list('pk', flat=True)[:10]
+    )
+    for pk in candidates:
+        claimed = PortfolioRequest.objects.filter(_claimable(), pk=pk).update(
+            status=PortfolioRequest.STATUS_PROCESSING,
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return PortfolioRequest.objects.select_related('user__userprofile').get(pk=pk)
+    return None
+
+
+def process_job(job):
+    """Extract and structure the resume attached to a claimed job"""
+    if job.attempts > settings.RESUME_JOB_MAX_ATTEMPTS:
+        _finish(job, PortfolioRequest.STATUS_FAILED, error='Processing timed out. Please try again.')
+        return
+
+    profile = None
+    api_key = None
+    if job.user is not None:
+        try:
+            profile = job.user.userprofile
+            api_key = (profile.gemini_api_key or '').strip() or None
+        except Exception as e:
+            print(f"DEBUG: Error accessing profile for job {job.pk}: {e}")
+
+    def publish_field(key, value):
+        # Shown on the progress page while Gemini is still generating
+        job.partial_data[key] = value
+        PortfolioRequest.objects.filter(pk=job.pk).update(partial_data=job.partial_data)
+
+    try:
+        with job.resume_file.open('rb') as pdf_file:
+            job.extracted_data = parse_resume_with_gemini(pdf_file, api_key=api_key, on_field=publish_field)
+    except Exception as e:
+        if api_key and api_key != settings.GEMINI_API_KEY:
+            error = f'API Key Error: {str(e)}. Please update your API key or use the premium feature.'
+        else:
+            error = f'Error processing resume: {str(e)}'
+        _finish(job, PortfolioRequest.STATUS_FAILED, error=error)
+        return
+
+    _finish(job, PortfolioRequest.STATUS_DONE)
+
+    # Mark that the user has used their free generation
+    if profile:
+        profile.has_generated_portfolio = True
+        profile.save_dirty()
+
+
+def _finish(job, status, error=''):
+    job.status = status
+    job.error = error
+    job.finished_at = timezone.now()
+    # The PDF is only needed until it has been processed
+    if job.resume_file:
+        job.resume_file.delete(save=False)
+    job.save()
+
+
+def run_worker(poll_interval=1.0, once=False, should_stop=None):
+    """
+    Process jobs until stopped
+
+    Args:
+        poll_interval: Seconds to sleep when the queue is empty or after an error
+        once: Exit as soon as the queue is empty
+        should_stop: Optional callable checked between jobs
+
+    Returns:
+        int: Number of jobs processed
+    """
+    processed = 0
+    while not (should_stop and should_stop()):
+        try:
+            # Drop connections that are past CONN_MAX_AGE or were broken by the last error
+            close_old_connections()
+            job = claim_next_job()
+            if job is None:
+                if once:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            print(f"Processing resume job {job.pk} (attempt {job.attempts})")
+            process_job(job)
+            processed += 1
+        except Exception as e:
+            # A transient DB error (locked SQLite file, dropped connection) must not end
+            # the worker; a job it interrupted is picked up again after RESUME_JOB_TIMEOUT
+            print(f"DEBUG: Resume worker error: {e}")
+            time.sleep(poll_interval)
+    return processed
@@ -0,0 +1,132 @@
+"""
+LLM backends used for resume extraction.
+
+settings.LLM_BACKEND names the backend class. GeminiBackend is the real
+one; FakeBackend answers locally with canned portfolio JSON after a
+configurable delay and error rate, so the upload flow can be exercised
+and load tested without a Gemini key or quota.
+"""
+import json
+import math
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .gemini_clients import build_request, get_client, response_text
+from .schema import PORTFOLIO_SCHEMA, example, field_schema, response_schema
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+class LLMBackend:
+    """Interface: turn a prompt into JSON text for some portfolio fields"""
+
+    def generate(self, api_key, prompt, fields=None):
+        """
+        Args:
+            api_key: API key to send the request with
+            prompt: Full prompt text
+            fields: Top-level portfolio fields requested (default: all)
+
+        Returns:
+            str: The response text
+        """
+        raise NotImplementedError
+
+    def stream(self, api_key, prompt, fields=None):
+        """Yield the response text in chunks as it is generated"""
+        yield self.generate(api_key, prompt, fields)
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini, constrained to the portfolio schema"""
+
+    def _request(self, prompt, fields):
+        return build_request(prompt, response_schema=response_schema(field_schema(fields)))
+
+    def generate(self, api_key, prompt, fields=None):
+        return response_text(get_client(api_key).generate_content(self._request(prompt, fields)))
+
+    def stream(self, api_key, prompt, fields=None):
+        for chunk in get_client(api_key).stream_generate_content(self._request(prompt, fields)):
+            try:
+                yield response_text(chunk)
+            except ValueError:
+                # Chunks without text (e.g. only a finish reason)
+                continue
+
+
+class FakeBackend(LLMBackend):
+    """
+    Local stand-in for Gemini
+
+    Latency is log-normally distributed around FAKE_LLM_LATENCY seconds
+    (spread FAKE_LLM_LATENCY_SIGMA), a FAKE_LLM_ERROR_RATE fraction of
+    calls fail with a quota error, and the response is the JSON in
+    FAKE_LLM_RESPONSE_FILE or the schema's example data. Set FAKE_LLM_SEED
+    for a repeatable sequence of delays and errors.
+    """
+
+    def __init__(self):
+        self._random = random.Random(settings.FAKE_LLM_SEED)
+        self._lock = threading.Lock()
+        if settings.FAKE_LLM_RESPONSE_FILE:
+            with open(settings.FAKE_LLM_RESPONSE_FILE, encoding='utf-8') as f:
+                self.data = json.load(f)
+        else:
+            self.data = example(PORTFOLIO_SCHEMA)
+
+    def _draw(self):
+        with self._lock:
+            latency = settings.FAKE_LLM_LATENCY * self._random.lognormvariate(
+                -settings.FAKE_LLM_LATENCY_SIGMA ** 2 / 2, settings.FAKE_LLM_LATENCY_SIGMA
+            ) if settings.FAKE_LLM_LATENCY_SIGMA else settings.FAKE_LLM_LATENCY
+            failed = self._random.random() < settings.FAKE_LLM_ERROR_RATE
+        return latency, failed
+
+    def _response(self, fields):
+        fields = PORTFOLIO_SCHEMA['properties'] if fields is None else fields
+        return json.dumps({key: self.data[key] for key in fields if key in self.data})
+
+    def _fail(self):
+        from google.api_core import exceptions as api_exceptions
+        raise api_exceptions.ResourceExhausted("Quota exceeded (simulated by FakeBackend). Please retry in 1s.")
+
+    def generate(self, api_key, prompt, fields=None):
+        latency, failed = self._draw()
+        time.sleep(latency)
+        if failed:
+            self._fail()
+        return self._response(fields)
+
+    def stream(self, api_key, prompt, fields=None):
+        latency, failed = self._draw()
+        if failed:
+            time.sleep(latency)
+            self._fail()
+        text = self._response(fields)
+        chunk_count = 10
+        chunk_size = math.ceil(len(text) / chunk_count)
+        for start in range(0, len(text), chunk_size):
+            time.sleep(latency / chunk_count)
+            yield text[start:start + chunk_size]
+
+
+def get_llm_backend():
+    """The configured backend instance (one per backend class)"""
+    path = settings.LLM_BACKEND
+    with _backends_lock:
+        backend = _backends.get(path)
+        if backend is None:
+            backend = _backends[path] = import_string(path)()
+        return backend
+
+
+def reset_llm_backends():
+    """Forget backend instances, e.g. after changing FAKE_LLM_* settings"""
+    with _backends_lock:
+        _backends.clear()
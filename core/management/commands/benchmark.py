@@ -0,0 +1,70 @@
+"""
+Management command to benchmark the extraction, rendering and packaging hot paths
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import compare_results, load_results, run_benchmarks, save_results
+
+
+class Command(BaseCommand):
+    help = 'Time PDF extraction, template compile/render, ZIP building, session encoding and middleware overhead'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Save the results as JSON to this path')
+        parser.add_argument('--compare', help='Baseline results JSON to compare this run against')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Relative slowdown of the median counted as a regression (default: 0.2 = 20%%)',
+        )
+        parser.add_argument('--quick', action='store_true', help='Fewer iterations, for a fast sanity check')
+        parser.add_argument('--only', help='Run only benchmarks whose name contains this text')
+        parser.add_argument(
+            '--fail-on-regression',
+            action='store_true',
+            help='Exit with an error if --compare finds regressions',
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                baseline = load_results(options['compare'])
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read baseline {options['compare']}: {e}")
+
+        results = run_benchmarks(quick=options['quick'], only=options['only'])
+        if not results['results']:
+            raise CommandError(f"No benchmarks match {options['only']!r}")
+
+        self.stdout.write(f"{'benchmark':<36}{'runs':>6}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'min ms':>10}")
+        for name, stats in results['results'].items():
+            self.stdout.write(
+                f"{name:<36}{stats['iterations']:>6}{stats['mean_ms']:>10.3f}"
+                f"{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['min_ms']:>10.3f}"
+            )
+
+        if options['output']:
+            save_results(results, options['output'])
+            self.stdout.write(f"Results saved to {options['output']}")
+
+        if baseline is None:
+            self.stdout.write(self.style.SUCCESS('Benchmarks complete.'))
+            return
+
+        rows = compare_results(baseline, results, threshold=options['threshold'])
+        self.stdout.write(f"\n{'benchmark':<36}{'base p50':>10}{'p50':>10}{'change':>9}")
+        for row in rows:
+            line = f"{row['name']:<36}{row['baseline']:>10.3f}{row['current']:>10.3f}{row['change']:>+9.1%}"
+            self.stdout.write(self.style.WARNING(line) if row['regression'] else line)
+
+        regressions = [row['name'] for row in rows if row['regression']]
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS(f"No regressions beyond {options['threshold']:.0%}."))
+        elif options['fail_on_regression']:
+            raise CommandError(f"Regressions beyond {options['threshold']:.0%}: {', '.join(regressions)}")
+        else:
+            self.stdout.write(self.style.WARNING(
+                f"{len(regressions)} regression(s) beyond {options['threshold']:.0%}: {', '.join(regressions)}"
+            ))
@@ -0,0 +1,148 @@
+"""
+Management command to report which modules slow down a cold start
+"""
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# SDKs that should only be imported when a request needs them
+LAZY_MODULES = ['firebase_admin', 'google.generativeai', 'google.api_core', 'grpc', 'pypdf']
+
+# Written to stderr between the first response and the warm-up it starts
+FIRST_RESPONSE_MARKER = 'importtime: first response sent'
+
+_SCRIPT = """
+import os
+import sys
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', {settings_module!r})
+{overrides}
+import {module}
+{after}
+"""
+
+_WITHOUT_WARMUP = """
+from django.conf import settings
+settings.WARMUP_ENABLED = False
+"""
+
+_FIRST_REQUEST = """
+import time
+from django.conf import settings
+from django.test import Client
+settings.ALLOWED_HOSTS = list(settings.ALLOWED_HOSTS) + ['testserver']
+Client().get({path!r})
+sys.stderr.write({marker!r} + '\\n')
+sys.stderr.flush()
+from core.warmup import STATUS_RUNNING, warmup_status
+while warmup_status()['status'] == STATUS_RUNNING:
+    time.sleep(0.05)
+"""
+
+
+def parse_importtime(output):
+    """
+    Parse `python -X importtime` output
+
+    Returns:
+        list: (module, self_us, cumulative_us) tuples in import order
+    """
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            # The header line
+            continue
+        rows.append((parts[2].strip(), int(parts[0]), int(parts[1])))
+    return rows
+
+
+def split_at_first_response(output):
+    """
+    Split the script's stderr into what was imported up to the first response and after it
+
+    Returns:
+        tuple: (before, after) output strings; after is '' if no request was served
+    """
+    before, marker, after = output.partition(FIRST_RESPONSE_MARKER)
+    return before, after if marker else ''
+
+
+class Command(BaseCommand):
+    help = 'Measure a cold start with python -X importtime and list the slowest modules'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--module',
+            default='portfolio_builder.wsgi',
+            help='Module to import, as the server would (default: portfolio_builder.wsgi)',
+        )
+        parser.add_argument(
+            '--path',
+            default='/',
+            help='Also serve one request to this path, so lazily imported views count (default: /)',
+        )
+        parser.add_argument('--no-request', action='store_true', help='Only import the module')
+        parser.add_argument(
+            '--without-warmup',
+            action='store_true',
+            help='Disable the warm-up that starts after the first response (default: as WARMUP_ENABLED says)',
+        )
+        parser.add_argument('--limit', type=int, default=25, help='Modules to list (default: 25)')
+        parser.add_argument(
+            '--sort',
+            choices=['cumulative', 'self'],
+            default='cumulative',
+            help='Rank by time including submodules (default) or by the module alone',
+        )
+
+    def handle(self, *args, **options):
+        script = _SCRIPT.format(
+            settings_module=os.environ.get('DJANGO_SETTINGS_MODULE', 'portfolio_builder.settings'),
+            module=options['module'],
+            overrides=_WITHOUT_WARMUP if options['without_warmup'] else '',
+            after='' if options['no_request'] else _FIRST_REQUEST.format(
+                path=options['path'],
+                marker=FIRST_RESPONSE_MARKER,
+            ),
+        )
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', script],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Import failed:\n{result.stderr[-2000:]}")
+
+        cold_output, warmup_output = split_at_first_response(result.stderr)
+        rows = parse_importtime(cold_output)
+        total = sum(self_us for _, self_us, _ in rows)
+        index = 1 if options['sort'] == 'self' else 2
+        slowest = sorted(rows, key=lambda row: row[index], reverse=True)[:options['limit']]
+
+        self.stdout.write(f"{len(rows)} modules imported in {total / 1000:.1f} ms\n")
+        self.stdout.write(f"{'cumulative ms':>14}{'self ms':>10}  module")
+        for name, self_us, cumulative_us in slowest:
+            self.stdout.write(f"{cumulative_us / 1000:>14.1f}{self_us / 1000:>10.1f}  {name}")
+
+        imported = {name for name, _, _ in rows}
+        loaded = [name for name in LAZY_MODULES if name in imported]
+        if loaded:
+            self.stdout.write(self.style.WARNING(
+                f"\nLoaded at startup but only needed on first use: {', '.join(loaded)}"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('\nNo heavy SDKs loaded at startup.'))
+
+        warmup_rows = parse_importtime(warmup_output)
+        if warmup_rows:
+            warmup_total = sum(self_us for _, self_us, _ in warmup_rows)
+            self.stdout.write(
+                f"\nAfter the first response (warm-up): {len(warmup_rows)} more modules "
+                f"in {warmup_total / 1000:.1f} ms"
+            )
@@ -0,0 +1,108 @@
+"""
+Management command to load test the upload -> preview -> download flow
+"""
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.llm_backends import reset_llm_backends
+from core.loadtest import STEPS, run_load_test
+from core.rendering import available_template_slugs
+
+
+class Command(BaseCommand):
+    help = 'Drive concurrent simulated users through the whole portfolio flow and report latency percentiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5, help='Concurrent simulated users (default: 5)')
+        parser.add_argument('--iterations', type=int, default=3, help='Flows per user (default: 3)')
+        parser.add_argument('--template', help='Template slug to preview and download (default: the first one)')
+        parser.add_argument('--pages', type=int, default=1, help='Pages per generated resume PDF (default: 1)')
+        parser.add_argument(
+            '--backend',
+            default='core.llm_backends.FakeBackend',
+            help='LLM backend to use (default: core.llm_backends.FakeBackend; pass '
+                 'core.llm_backends.GeminiBackend to spend real quota)',
+        )
+        parser.add_argument('--latency', type=float, help='FakeBackend mean latency in seconds')
+        parser.add_argument('--error-rate', type=float, help='FakeBackend fraction of simulated quota errors')
+        parser.add_argument(
+            '--same-resume',
+            action='store_true',
+            help='Upload the same resume every time (exercises the extraction cache)',
+        )
+        parser.add_argument(
+            '--rate-limit',
+            action='store_true',
+            help='Keep the Gemini rate limiter at its configured rates (by default it is lifted for the run)',
+        )
+        parser.add_argument('--json', action='store_true', help='Print the raw results as JSON')
+        parser.add_argument(
+            '--keep-data',
+            '--keep-users',
+            dest='keep_data',
+            action='store_true',
+            help="Don't delete the loadtest-* users and the data the run created afterwards",
+        )
+
+    def handle(self, *args, **options):
+        slugs = available_template_slugs()
+        template = options['template'] or (slugs[0] if slugs else None)
+        if template not in slugs:
+            raise CommandError(f"Unknown template {template!r}. Available: {', '.join(slugs)}")
+
+        overrides = {'LLM_BACKEND': options['backend']}
+        if options['latency'] is not None:
+            overrides['FAKE_LLM_LATENCY'] = options['latency']
+        if options['error_rate'] is not None:
+            overrides['FAKE_LLM_ERROR_RATE'] = options['error_rate']
+        if not settings.GEMINI_API_KEY:
+            # Uploads need some key; the fake backend never uses it
+            overrides['GEMINI_API_KEY'] = 'loadtest-key'
+        if not options['rate_limit']:
+            overrides['GEMINI_SYSTEM_KEY_RPM'] = overrides['GEMINI_USER_KEY_RPM'] = 1000000
+
+        self.stderr.write(
+            f"Running {options['users']} users x {options['iterations']} flows "
+            f"against '{template}' with {options['backend']}..."
+        )
+        reset_llm_backends()
+        try:
+            results = run_load_test(
+                users=max(1, options['users']),
+                iterations=max(1, options['iterations']),
+                template_slug=template,
+                unique_resumes=not options['same_resume'],
+                pdf_pages=max(1, options['pages']),
+                settings_overrides=overrides,
+                keep_data=options['keep_data'],
+            )
+        finally:
+            reset_llm_backends()
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(
+            f"\n{results['flows']} flows in {results['elapsed']:.2f}s "
+            f"({results['flows_per_second']:.2f} flows/s)\n"
+        )
+        self.stdout.write(f"{'step':<10}{'ok':>6}{'err':>6}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for step in STEPS:
+            stats = results['steps'][step]
+            if not stats['count']:
+                self.stdout.write(f"{step:<10}{0:>6}{stats['errors']:>6}")
+                continue
+            self.stdout.write(
+                f"{step:<10}{stats['count']:>6}{stats['errors']:>6}{stats['rps']:>9.2f}"
+                f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}"
+            )
+        for sample in results['error_samples']:
+            self.stdout.write(self.style.WARNING(f"  {sample}"))
+
+        if any(results['steps'][step]['errors'] for step in STEPS):
+            self.stdout.write(self.style.WARNING('Load test finished with errors.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Load test complete.'))
@@ -0,0 +1,124 @@
+"""
+Management command to archive and delete old raw visitor records
+"""
+import gzip
+import json
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from django.utils import timezone
+
+from core.models import DailyVisitStat, HourlyVisitStat, Visitor
+from core.visitor_stats import day_start, rebuild_visit_rollups
+
+
+class Command(BaseCommand):
+    help = 'Roll up, optionally archive, and delete raw visits older than the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.VISITOR_RETENTION_DAYS,
+            help=f'Keep raw visits for this many days (default: {settings.VISITOR_RETENTION_DAYS})',
+        )
+        parser.add_argument(
+            '--archive-dir',
+            help='Write each pruned day to <dir>/visits-YYYY-MM-DD.jsonl.gz before deleting it',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows deleted per statement, to keep locks short (default: 5000)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.0,
+            help='Seconds to pause between delete batches',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would be pruned without changing anything',
+        )
+
+    def handle(self, *args, **options):
+        retention_days = max(1, options['days'])
+        archive_dir = options['archive_dir']
+        batch_size = max(1, options['batch_size'])
+        dry_run = options['dry_run']
+
+        cutoff_date = timezone.localdate() - timedelta(days=retention_days)
+        first_visit = Visitor.objects.filter(timestamp__lt=day_start(cutoff_date)).aggregate(
+            first=Min('timestamp')
+        )['first']
+
+        if first_visit is None:
+            self.stdout.write(self.style.SUCCESS(f'No raw visits older than {cutoff_date}.'))
+        else:
+            if archive_dir and not dry_run:
+                os.makedirs(archive_dir, exist_ok=True)
+
+            day = timezone.localtime(first_visit).date()
+            while day < cutoff_date:
+                self.prune_day(day, archive_dir, batch_size, options['sleep'], dry_run)
+                day += timedelta(days=1)
+
+        # Hourly rollups are only shown for recent activity; daily ones are kept
+        hourly = HourlyVisitStat.objects.filter(hour__lt=day_start(cutoff_date))
+        if dry_run:
+            self.stdout.write(f'Would delete {hourly.count()} hourly rollup rows')
+        else:
+            deleted, _ = hourly.delete()
+            self.stdout.write(f'Deleted {deleted} hourly rollup rows')
+
+        self.stdout.write(self.style.SUCCESS('Visitor pruning complete.'))
+
+    def prune_day(self, day, archive_dir, batch_size, sleep, dry_run):
+        visits = Visitor.objects.filter(
+            timestamp__gte=day_start(day),
+            timestamp__lt=day_start(day + timedelta(days=1)),
+        )
+        count = visits.count()
+        if not count:
+            return
+
+        if dry_run:
+            self.stdout.write(f'{day}: would prune {count} visits')
+            return
+
+        # Make sure the day survives in the rollups before its raw rows go
+        if not DailyVisitStat.objects.filter(date=day).exists():
+            rebuild_visit_rollups(day, day)
+
+        if archive_dir:
+            self.archive_day(day, visits, archive_dir)
+
+        deleted = 0
+        while True:
+            batch = list(visits.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                break
+            deleted += Visitor.objects.filter(pk__in=batch).delete()[0]
+            if sleep:
+                time.sleep(sleep)
+
+        self.stdout.write(f'{day}: pruned {deleted} visits')
+
+    def archive_day(self, day, visits, archive_dir):
+        path = os.path.join(archive_dir, f'visits-{day.isoformat()}.jsonl.gz')
+        rows = visits.order_by('pk').values(
+            'id', 'ip_address', 'user_agent', 'path', 'timestamp', 'session_key'
+        )
+        # Appending keeps earlier partial archives of the same day (gzip members concatenate)
+        with gzip.open(path, 'at', encoding='utf-8') as archive:
+            for row in rows.iterator(chunk_size=2000):
+                row['timestamp'] = row['timestamp'].isoformat()
+                archive.write(json.dumps(row) + '\n')
+        self.stdout.write(f'{day}: archived to {path}')
@@ -0,0 +1,50 @@
+"""
+Management command to rebuild the visitor rollup tables from raw visits
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from django.utils import timezone
+
+from core.models import Visitor
+from core.visitor_stats import last_closed_day, rebuild_visit_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute daily/hourly visitor rollups and unique visitor sketches from raw visits'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=2,
+            help='Number of most recent closed days to rebuild; today is kept up to date as visits arrive (default: 2)',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Rebuild every day that has raw visits (use once to backfill)',
+        )
+
+    def handle(self, *args, **options):
+        end_date = last_closed_day()
+
+        if options['all']:
+            first_visit = Visitor.objects.aggregate(first=Min('timestamp'))['first']
+            if first_visit is None:
+                self.stdout.write(self.style.WARNING('No visits recorded yet.'))
+                return
+            start_date = timezone.localtime(first_visit).date()
+        else:
+            start_date = end_date - timedelta(days=max(1, options['days']) - 1)
+
+        if start_date > end_date:
+            self.stdout.write(self.style.WARNING('No closed days to rebuild yet.'))
+            return
+
+        self.stdout.write(f'Rebuilding visitor rollups from {start_date} to {end_date}...')
+        total = rebuild_visit_rollups(start_date, end_date)
+        self.stdout.write(
+            self.style.SUCCESS(f'Aggregated {total} visits.')
+        )
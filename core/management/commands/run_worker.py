@@ -0,0 +1,88 @@
+"""
+Management command that drains the resume processing queue
+"""
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def _worker_main(poll_interval, once):
+    """Entry point for a worker process"""
+    import django
+    django.setup()
+
+    from core.jobs import run_worker
+    from core.warmup import start_warmup
+
+    # Pay for SDK imports and client setup before the first job, not during it
+    start_warmup(in_background=False)
+
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *args: stopping.append(True))
+    try:
+        run_worker(poll_interval=poll_interval, once=once, should_stop=lambda: bool(stopping))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Process queued resume uploads (used when RESUME_PROCESSING_ASYNC=True)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=2,
+            help='Number of worker processes to run (default: 2)',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait between polls when the queue is empty',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is empty instead of polling forever',
+        )
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        poll_interval = options['poll_interval']
+        once = options['once']
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Starting {processes} resume worker(s)...')
+        )
+
+        if processes == 1:
+            _worker_main(poll_interval, once)
+            return
+
+        # Forked children must not share the parent's DB connections
+        connections.close_all()
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+        workers = [
+            context.Process(target=_worker_main, args=(poll_interval, once), daemon=False)
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Stopping workers...'))
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.join()
+
+        self.stdout.write(self.style.SUCCESS('Workers stopped.'))
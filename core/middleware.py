@@ -1,30 +1,157 @@
+import atexit
+import hashlib
+import os
+import random
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
 from .models import Visitor
+from .visitor_stats import record_visits
+
+
+class VisitBuffer:
+    """
+    In-process ring buffer of page views, written with bulk_create by a
+    background thread once `flush_size` visits are queued or every
+    `flush_interval` seconds. Each flush also updates the visit rollups.
+    When the buffer is full the oldest visits are dropped rather than
+    blocking requests.
+    """
+
+    def __init__(self, max_size, flush_size, flush_interval):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._visits = deque(maxlen=max_size)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        atexit.register(self.flush)
+
+    def add(self, visit):
+        with self._lock:
+            if len(self._visits) == self._visits.maxlen:
+                self.dropped += 1
+            self._visits.append(visit)
+            pending = len(self._visits)
+            self._ensure_thread()
+
+        if pending >= self.flush_size:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write all buffered visits to the database"""
+        with self._lock:
+            batch = list(self._visits)
+            self._visits.clear()
+
+        if not batch:
+            return 0
+
+        close_old_connections()
+        try:
+            try:
+                Visitor.objects.bulk_create(batch, batch_size=500)
+            except Exception as e:
+                # One bad row shouldn't cost the whole batch
+                print(f"Error flushing {len(batch)} visitor records, saving them one by one: {e}")
+                batch = _save_each(batch)
+            if batch:
+                record_visits(batch)
+        except Exception as e:
+            # Silently fail to not interrupt the user experience
+            print(f"Error flushing {len(batch)} visitor records: {e}")
+            return 0
+        finally:
+            close_old_connections()
+        return len(batch)
+
+    def _ensure_thread(self):
+        # A forked worker inherits the buffer but not the flushing thread
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name='visit-buffer-flush', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+def _save_each(visits):
+    """Insert visits one at a time, skipping any that fail; returns the saved ones"""
+    saved = []
+    for visit in visits:
+        try:
+            visit.save()
+        except Exception as e:
+            print(f"Error saving visitor record for {visit.path}: {e}")
+        else:
+            saved.append(visit)
+    return saved
+
+
+def _session_key(request):
+    """
+    The session key as stored on Visitor rows
+
+    Signed-cookie sessions use the whole cookie as the key, far longer than
+    the column, so those are stored as a hash.
+    """
+    session = getattr(request, 'session', None)
+    session_key = session.session_key if session else None
+    max_length = Visitor._meta.get_field('session_key').max_length
+    if session_key and len(session_key) > max_length:
+        return hashlib.sha1(session_key.encode('utf-8')).hexdigest()[:max_length]
+    return session_key
+
+
+visit_buffer = VisitBuffer(
+    max_size=settings.VISITOR_TRACKING_BUFFER_SIZE,
+    flush_size=settings.VISITOR_TRACKING_FLUSH_SIZE,
+    flush_interval=settings.VISITOR_TRACKING_FLUSH_INTERVAL,
+)
+
 
 class VisitorTrackingMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
+        self.sample_rate = settings.VISITOR_TRACKING_SAMPLE_RATE
+        self.exclude_paths = tuple(settings.VISITOR_TRACKING_EXCLUDE_PATHS)
 
     def __call__(self, request):
-        # Skip tracking for static files and admin
-        if not request.path.startswith('/static/') and not request.path.startswith('/admin/'):
+        # Skip tracking for static files, admin and other excluded paths
+        if not request.path.startswith(self.exclude_paths) and self._sampled():
             try:
                 # Get IP address
                 x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
                 if x_forwarded_for:
-                    ip = x_forwarded_for.split(',')[0]
+                    ip = x_forwarded_for.split(',')[0].strip()
                 else:
                     ip = request.META.get('REMOTE_ADDR')
 
-                # Create visitor record
-                Visitor.objects.create(
+                # Queue visitor record; it is written in the background
+                visit_buffer.add(Visitor(
                     ip_address=ip,
                     user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                    path=request.path,
-                    session_key=request.session.session_key if request.session else None
-                )
+                    path=request.path[:255],
+                    timestamp=timezone.now(),
+                    session_key=_session_key(request)
+                ))
             except Exception as e:
                 # Silently fail to not interrupt the user experience
                 print(f"Error tracking visitor: {e}")
 
         response = self.get_response(request)
         return response
+
+    def _sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:07
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_portfoliorequest_job_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='visitor',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_visitor_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyVisitStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('path', models.CharField(blank=True, max_length=255)),
+                ('visits', models.PositiveIntegerField(default=0)),
+                ('unique_visitors', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'path'), name='unique_daily_visit_stat')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HourlyVisitStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('path', models.CharField(blank=True, max_length=255)),
+                ('visits', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('hour', 'path'), name='unique_hourly_visit_stat')],
+            },
+        ),
+    ]
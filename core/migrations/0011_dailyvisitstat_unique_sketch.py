@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_visit_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyvisitstat',
+            name='unique_sketch',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_dailyvisitstat_unique_sketch'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='visitor',
+            index=models.Index(fields=['-timestamp', '-id'], name='visitor_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visitor',
+            index=models.Index(fields=['path', 'timestamp'], name='visitor_path_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visitor',
+            index=models.Index(fields=['ip_address', 'timestamp'], name='visitor_ip_time_idx'),
+        ),
+    ]
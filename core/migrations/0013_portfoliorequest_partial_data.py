@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_visitor_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='portfoliorequest',
+            name='partial_data',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
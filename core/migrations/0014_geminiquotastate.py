@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:21
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_portfoliorequest_partial_data'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeminiQuotaState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key_fingerprint', models.CharField(max_length=16, unique=True)),
+                ('tokens', models.FloatField(default=0)),
+                ('refilled_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('consecutive_failures', models.PositiveIntegerField(default=0)),
+                ('open_until', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
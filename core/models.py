@@ -2,15 +2,61 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.utils import timezone
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     has_generated_portfolio = models.BooleanField(default=False)
     gemini_api_key = models.CharField(max_length=255, blank=True, null=True)
+
+    # Fields compared with their saved values by save_dirty()
+    TRACKED_FIELDS = ('has_generated_portfolio', 'gemini_api_key')
     
     def __str__(self):
         return self.user.username
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_values = {
+            name: value for name, value in zip(field_names, values) if name in cls.TRACKED_FIELDS
+        }
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        saved = getattr(self, '_saved_values', {})
+        for name in self.TRACKED_FIELDS:
+            if update_fields is None or name in update_fields:
+                saved[name] = getattr(self, name)
+        self._saved_values = saved
+
+    def dirty_fields(self):
+        """Tracked fields changed since the profile was loaded or last saved"""
+        saved = getattr(self, '_saved_values', {})
+        deferred = self.get_deferred_fields()
+        return [
+            name for name in self.TRACKED_FIELDS
+            if name not in deferred and (name not in saved or saved[name] != getattr(self, name))
+        ]
+
+    def save_dirty(self):
+        """
+        Save only the fields that changed, in one UPDATE
+
+        Returns:
+            bool: Whether anything was written
+        """
+        if self._state.adding:
+            self.save()
+            return True
+        fields = self.dirty_fields()
+        if not fields:
+            return False
+        self.save(update_fields=fields)
+        return True
+
 class PortfolioTemplate(models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True)
@@ -22,10 +68,28 @@ class PortfolioTemplate(models.Model):
         return self.name
 
 class PortfolioRequest(models.Model):
-    # Optional: link to user if you want to track who made the request
-    # user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    # Resume processing jobs - queued by upload_resume, drained by `manage.py run_worker`
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     resume_file = models.FileField(upload_to='resumes/', null=True, blank=True)
     extracted_data = models.JSONField(null=True, blank=True)
+    # Top-level fields published while the Gemini response is still streaming
+    partial_data = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -36,12 +100,90 @@ class Visitor(models.Model):
     ip_address = models.GenericIPAddressField()
     user_agent = models.TextField(blank=True, null=True)
     path = models.CharField(max_length=255)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set by the tracking middleware at request time; rows are inserted later in batches
+    timestamp = models.DateTimeField(default=timezone.now)
     session_key = models.CharField(max_length=40, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # Recent visits / keyset pagination on the dashboard, retention by age
+            models.Index(fields=['-timestamp', '-id'], name='visitor_recent_idx'),
+            # Per-path and per-visitor lookups over a time range
+            models.Index(fields=['path', 'timestamp'], name='visitor_path_time_idx'),
+            models.Index(fields=['ip_address', 'timestamp'], name='visitor_ip_time_idx'),
+        ]
+
     def __str__(self):
         return f"Visit from {self.ip_address} to {self.path} at {self.timestamp}"
 
+class DailyVisitStat(models.Model):
+    """Page views per day and path; rows with path '' hold the site-wide totals"""
+    ALL_PATHS = ''
+
+    date = models.DateField()
+    path = models.CharField(max_length=255, blank=True)
+    visits = models.PositiveIntegerField(default=0)
+    unique_visitors = models.PositiveIntegerField(default=0)
+    # HyperLogLog sketch of the day's visitor IPs (see core.hyperloglog)
+    unique_sketch = models.BinaryField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'path'], name='unique_daily_visit_stat'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.path or '(all)'}: {self.visits} visits"
+
+class HourlyVisitStat(models.Model):
+    """Page views per hour and path; rows with path '' hold the site-wide totals"""
+    ALL_PATHS = ''
+
+    hour = models.DateTimeField()
+    path = models.CharField(max_length=255, blank=True)
+    visits = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hour', 'path'], name='unique_hourly_visit_stat'),
+        ]
+
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H:00} {self.path or '(all)'}: {self.visits} visits"
+
+class ExtractionCacheEntry(models.Model):
+    """Gemini extraction result keyed by a hash of the resume text and prompt version"""
+    content_hash = models.CharField(max_length=64, unique=True)
+    prompt_version = models.CharField(max_length=20)
+    data = models.JSONField()
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.content_hash[:12]} (v{self.prompt_version}, {self.hit_count} hits)"
+
+class PortfolioDataEntry(models.Model):
+    """Zlib-compressed portfolio data referenced from the session by its digest (see core.portfolio_store)"""
+    key = models.CharField(max_length=64, unique=True)
+    payload = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.key[:12]} ({len(self.payload)} bytes)"
+
+class GeminiQuotaState(models.Model):
+    """Shared rate limiter and circuit breaker state for one Gemini API key (see core.quota)"""
+    key_fingerprint = models.CharField(max_length=16, unique=True)
+    tokens = models.FloatField(default=0)
+    refilled_at = models.DateTimeField(default=timezone.now)
+    consecutive_failures = models.PositiveIntegerField(default=0)
+    open_until = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.key_fingerprint}: {self.tokens:.1f} tokens, {self.consecutive_failures} failures"
+
 class PremiumWaitlist(models.Model):
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     email = models.EmailField()
@@ -53,13 +195,16 @@ class PremiumWaitlist(models.Model):
 
 # Signal to automatically create/save UserProfile when User is created/saved
 @receiver(post_save, sender=User)
-def create_user_profile(sender, instance, created, **kwargs):
+def save_user_profile(sender, instance, created, update_fields=None, **kwargs):
     if created:
         UserProfile.objects.create(user=instance)
-
-@receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    try:
-        instance.userprofile.save()
-    except UserProfile.DoesNotExist:
-        UserProfile.objects.create(user=instance)
+        return
+    if User.userprofile.is_cached(instance):
+        # Changes made through user.userprofile are saved with the user, if there are any
+        try:
+            instance.userprofile.save_dirty()
+        except UserProfile.DoesNotExist:
+            UserProfile.objects.create(user=instance)
+    elif update_fields is None or set(update_fields) - {'last_login'}:
+        # Not loaded, so nothing to save; just make sure it exists (login() only touches last_login)
+        UserProfile.objects.get_or_create(user=instance)
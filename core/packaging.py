@@ -0,0 +1,199 @@
+"""
+Streaming ZIP packaging for portfolio downloads.
+
+The archive is written entry by entry as the response is consumed, so only
+the rendered index.html is compressed per request. Static assets next to a
+template are prepared once per template version: small ones are deflated
+(or stored, for formats that are already compressed) and kept in memory,
+large ones are stored uncompressed and streamed from disk in chunks, so
+peak memory does not grow with asset size.
+
+Only the classic (non-ZIP64) format is produced, which limits entries and
+the archive to 4GB - far beyond any portfolio template.
+"""
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+from django.conf import settings
+
+from .rendering import portfolio_template_dir
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+
+# Formats that don't shrink further when deflated
+PRECOMPRESSED_EXTENSIONS = {
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.ico',
+    '.woff', '.woff2', '.mp3', '.mp4', '.webm', '.pdf', '.zip', '.gz',
+}
+
+CHUNK_SIZE = 64 * 1024
+
+_FLAG_UTF8 = 0x0800
+_VERSION = 20
+_MAX_SIZE = 0xFFFFFFFF
+
+ZipEntry = namedtuple(
+    'ZipEntry',
+    ['name', 'method', 'crc', 'compressed_size', 'size', 'dos_time', 'dos_date', 'data', 'path'],
+)
+
+_asset_entries = {}
+_asset_lock = threading.Lock()
+
+
+def _dos_datetime(timestamp):
+    t = time.localtime(timestamp)
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = (max(t.tm_year, 1980) - 1980) << 9 | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+def _deflate(data):
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+def entry_from_bytes(name, data, timestamp=None, compress=True):
+    """Build an in-memory entry, deflating it unless that doesn't help"""
+    dos_time, dos_date = _dos_datetime(timestamp if timestamp is not None else time.time())
+    crc = zlib.crc32(data)
+    method = ZIP_STORED
+    payload = data
+    if compress:
+        deflated = _deflate(data)
+        if len(deflated) < len(data):
+            method, payload = ZIP_DEFLATED, deflated
+    return ZipEntry(name, method, crc, len(payload), len(data), dos_time, dos_date, payload, None)
+
+
+def entry_from_file(name, path):
+    """Build an entry for a file on disk, keeping large files out of memory"""
+    stat = os.stat(path)
+    if stat.st_size > _MAX_SIZE:
+        raise ValueError(f"{name} is too large for a ZIP archive")
+
+    extension = os.path.splitext(name)[1].lower()
+    compress = extension not in PRECOMPRESSED_EXTENSIONS
+
+    if stat.st_size <= settings.ZIP_ASSET_MEMORY_LIMIT:
+        with open(path, 'rb') as f:
+            return entry_from_bytes(name, f.read(), stat.st_mtime, compress=compress)
+
+    # Large asset: store it and stream it from disk at download time
+    crc = 0
+    for chunk in _read_chunks(path):
+        crc = zlib.crc32(chunk, crc)
+    dos_time, dos_date = _dos_datetime(stat.st_mtime)
+    return ZipEntry(name, ZIP_STORED, crc, stat.st_size, stat.st_size, dos_time, dos_date, None, path)
+
+
+def _read_chunks(path):
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def _asset_files(template_dir):
+    for root, dirs, files in os.walk(template_dir):
+        dirs.sort()
+        for file in sorted(files):
+            file_path = os.path.join(root, file)
+            arcname = os.path.relpath(file_path, template_dir).replace(os.sep, '/')
+            if arcname != 'index.html':
+                yield arcname, file_path
+
+
+def get_asset_entries(template_slug):
+    """
+    Return the prepared asset entries for a template (everything except index.html)
+
+    Entries are rebuilt when any asset changes in DEBUG and built once per
+    process in production.
+    """
+    cached = _asset_entries.get(template_slug)
+    if cached is not None and not settings.DEBUG:
+        return cached[1]
+
+    template_dir = portfolio_template_dir(template_slug)
+    files = list(_asset_files(template_dir))
+    version = tuple((arcname, os.stat(path).st_mtime_ns) for arcname, path in files)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    with _asset_lock:
+        entries = [entry_from_file(arcname, path) for arcname, path in files]
+        _asset_entries[template_slug] = (version, entries)
+    return entries
+
+
+def _local_header(entry):
+    name = entry.name.encode('utf-8')
+    return struct.pack(
+        '<IHHHHHIIIHH',
+        0x04034b50, _VERSION, _FLAG_UTF8, entry.method, entry.dos_time, entry.dos_date,
+        entry.crc, entry.compressed_size, entry.size, len(name), 0,
+    ) + name
+
+
+def _central_header(entry, offset):
+    name = entry.name.encode('utf-8')
+    return struct.pack(
+        '<IHHHHHHIIIHHHHHII',
+        0x02014b50, (3 << 8) | _VERSION, _VERSION, _FLAG_UTF8, entry.method,
+        entry.dos_time, entry.dos_date, entry.crc, entry.compressed_size, entry.size,
+        len(name), 0, 0, 0, 0, 0o100644 << 16, offset,
+    ) + name
+
+
+def _end_record(count, directory_size, directory_offset):
+    return struct.pack(
+        '<IHHHHIIH',
+        0x06054b50, 0, 0, count, count, directory_size, directory_offset, 0,
+    )
+
+
+def zip_size(entries):
+    """Exact size in bytes of the archive stream_zip will produce"""
+    total = 22  # end of central directory record
+    for entry in entries:
+        name_length = len(entry.name.encode('utf-8'))
+        total += 30 + name_length + entry.compressed_size + 46 + name_length
+    return total
+
+
+def stream_zip(entries):
+    """Yield a ZIP archive of the given entries chunk by chunk"""
+    offset = 0
+    directory = []
+    for entry in entries:
+        directory.append(_central_header(entry, offset))
+
+        header = _local_header(entry)
+        yield header
+        offset += len(header)
+
+        if entry.data is not None:
+            yield entry.data
+        else:
+            yield from _read_chunks(entry.path)
+        offset += entry.compressed_size
+
+        if offset > _MAX_SIZE:
+            raise ValueError("Portfolio archive is too large")
+
+    central_directory = b''.join(directory)
+    yield central_directory + _end_record(len(directory), len(central_directory), offset)
+
+
+def portfolio_zip_entries(template_slug, rendered_html):
+    """Entries for a portfolio download: the rendered page plus the template's assets"""
+    index = entry_from_bytes('index.html', rendered_html.encode('utf-8'))
+    return [index] + get_asset_entries(template_slug)
@@ -0,0 +1,257 @@
+"""
+PDF text extraction.
+
+Short PDFs are extracted page by page in the calling thread. PDFs with at
+least PDF_PARALLEL_MIN_PAGES pages are split into page ranges that run in
+a shared process pool: the file is copied once into a shared memory block
+and every worker opens its own PdfReader over it. If the pool can't be
+used (e.g. no /dev/shm on a serverless host) extraction falls back to the
+serial path.
+
+Extraction is budgeted: only the first `max_pages` pages are read, it stops
+once `max_chars` characters have been collected, and pages without any
+fonts (scans, full-page images) are skipped without running the text
+extractor. Every run produces an ExtractionReport with per-page timings
+and the pages that were dropped.
+"""
+import math
+import multiprocessing
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+
+PAGE_EXTRACTED = 'extracted'
+PAGE_EMPTY = 'empty'
+PAGE_NO_TEXT_LAYER = 'no_text_layer'
+PAGE_OVER_PAGE_LIMIT = 'over_page_limit'
+PAGE_OVER_CHAR_BUDGET = 'over_char_budget'
+
+PageReport = namedtuple('PageReport', ['number', 'status', 'chars', 'seconds'])
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class ExtractionReport:
+    """What happened to each page of a PDF during extraction"""
+
+    def __init__(self, page_count):
+        self.page_count = page_count
+        self.pages = []
+        self.seconds = 0.0
+
+    @property
+    def chars(self):
+        return sum(page.chars for page in self.pages)
+
+    @property
+    def extracted_pages(self):
+        return [page.number for page in self.pages if page.status == PAGE_EXTRACTED]
+
+    @property
+    def dropped_pages(self):
+        """Page numbers (1-based) whose text is not in the result"""
+        return [page.number for page in self.pages if page.status != PAGE_EXTRACTED]
+
+    def summary(self):
+        dropped = self.dropped_pages
+        text = (
+            f"Extracted {len(self.extracted_pages)}/{self.page_count} pages "
+            f"({self.chars} chars) in {self.seconds:.2f}s"
+        )
+        if dropped:
+            text += f"; dropped pages: {_format_ranges(dropped)}"
+        return text
+
+
+def _format_ranges(numbers):
+    ranges = []
+    start = previous = numbers[0]
+    for number in numbers[1:] + [None]:
+        if number is not None and number == previous + 1:
+            previous = number
+            continue
+        ranges.append(str(start) if start == previous else f"{start}-{previous}")
+        if number is not None:
+            start = previous = number
+    return ', '.join(ranges)
+
+
+def read_pdf_bytes(pdf_file):
+    """Return the raw bytes of a path or file-like object"""
+    if isinstance(pdf_file, (str, os.PathLike)):
+        with open(pdf_file, 'rb') as f:
+            return f.read()
+    if hasattr(pdf_file, 'seek'):
+        pdf_file.seek(0)
+    return pdf_file.read()
+
+
+def _has_text_layer(page):
+    """Cheap check for fonts on the page; pages without any can't contain text"""
+    resources = page.get('/Resources')
+    if resources is None:
+        return False
+    resources = resources.get_object()
+    if resources.get('/Font'):
+        return True
+
+    xobjects = resources.get('/XObject')
+    for xobject in (xobjects.get_object().values() if xobjects else []):
+        xobject = xobject.get_object()
+        if xobject.get('/Subtype') != '/Form':
+            continue
+        form_resources = xobject.get('/Resources')
+        # A form without its own resources may use the page's; assume it has text
+        if form_resources is None or form_resources.get_object().get('/Font'):
+            return True
+    return False
+
+
+def _extract_page(page, number):
+    started = time.perf_counter()
+    if not _has_text_layer(page):
+        return '', PageReport(number, PAGE_NO_TEXT_LAYER, 0, time.perf_counter() - started)
+
+    text = (page.extract_text() or '').strip()
+    status = PAGE_EXTRACTED if text else PAGE_EMPTY
+    return text, PageReport(number, status, len(text), time.perf_counter() - started)
+
+
+def _extract_range(shm_name, size, start, stop):
+    """Worker: extract pages [start, stop) from the PDF in shared memory"""
+    from multiprocessing import shared_memory
+    from pypdf import PdfReader
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        data = bytes(shm.buf[:size])
+    finally:
+        shm.close()
+
+    reader = PdfReader(BytesIO(data))
+    return [_extract_page(reader.pages[index], index + 1) for index in range(start, stop)]
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Don't fork: the web process may be running threads
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            _executor = ProcessPoolExecutor(max_workers=settings.PDF_EXTRACT_WORKERS, mp_context=context)
+        return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        _executor = None
+
+
+def _page_ranges(page_count, workers):
+    # A couple of ranges per worker evens out pages of uneven cost
+    size = max(1, math.ceil(page_count / (workers * 2)))
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def _iter_serial(reader, page_limit):
+    for index in range(page_limit):
+        yield _extract_page(reader.pages[index], index + 1)
+
+
+def _iter_parallel(data, page_limit, cancelled):
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(create=True, size=len(data))
+    futures = []
+    try:
+        shm.buf[:len(data)] = data
+        executor = _get_executor()
+        futures = [
+            executor.submit(_extract_range, shm.name, len(data), start, stop)
+            for start, stop in _page_ranges(page_limit, settings.PDF_EXTRACT_WORKERS)
+        ]
+        for future in futures:
+            yield from future.result()
+            if cancelled():
+                break
+    finally:
+        for future in futures:
+            future.cancel()
+        # Wait for ranges already running before releasing their buffer
+        for future in futures:
+            if not future.cancelled():
+                try:
+                    future.result()
+                except Exception:
+                    pass
+        shm.close()
+        shm.unlink()
+
+
+def extract_pages(pdf_file, max_pages=None, max_chars=None):
+    """
+    Extract page texts within a page and character budget
+
+    Args:
+        pdf_file: Path to the PDF file OR a file-like object
+        max_pages: Read at most this many pages (default: PDF_MAX_PAGES)
+        max_chars: Stop after this many characters (default: PDF_MAX_CHARS)
+
+    Returns:
+        tuple: (list of page texts that yielded text, ExtractionReport)
+    """
+    from pypdf import PdfReader
+
+    max_pages = settings.PDF_MAX_PAGES if max_pages is None else max_pages
+    max_chars = settings.PDF_MAX_CHARS if max_chars is None else max_chars
+
+    started = time.perf_counter()
+    data = read_pdf_bytes(pdf_file)
+    reader = PdfReader(BytesIO(data))
+    page_count = len(reader.pages)
+    page_limit = min(page_count, max_pages) if max_pages else page_count
+
+    report = ExtractionReport(page_count)
+    texts = []
+    chars = 0
+
+    def over_budget():
+        return bool(max_chars) and chars >= max_chars
+
+    def collect(results):
+        nonlocal chars
+        for text, page_report in results:
+            report.pages.append(page_report)
+            if text:
+                texts.append(text)
+                chars += len(text)
+            if over_budget():
+                break
+
+    parallel = settings.PDF_EXTRACT_WORKERS > 1 and page_limit >= settings.PDF_PARALLEL_MIN_PAGES
+    if parallel:
+        try:
+            collect(_iter_parallel(data, page_limit, over_budget))
+        except (OSError, ImportError, RuntimeError) as e:
+            if isinstance(e, BrokenExecutor):
+                _reset_executor()
+            print(f"DEBUG: Parallel PDF extraction unavailable, extracting serially: {e}")
+            report.pages, texts, chars = [], [], 0
+            parallel = False
+    if not parallel:
+        collect(_iter_serial(reader, page_limit))
+
+    for number in range(len(report.pages) + 1, page_count + 1):
+        status = PAGE_OVER_CHAR_BUDGET if number <= page_limit else PAGE_OVER_PAGE_LIMIT
+        report.pages.append(PageReport(number, status, 0, 0.0))
+
+    report.seconds = time.perf_counter() - started
+    return texts, report
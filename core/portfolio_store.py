@@ -0,0 +1,261 @@
+"""
+Server-side storage for extracted portfolio data.
+
+Sessions are signed cookies, so keeping the whole portfolio_data dict in
+the session meant every request carried a multi-KB cookie that had to be
+verified, decoded and parsed (and big resumes could outgrow the 4KB cookie
+limit). Instead the data is stored zlib-compressed under its content
+digest and the session only holds that 64-character key.
+
+PORTFOLIO_STORE_BACKEND picks where payloads live: DatabaseStore (the
+default; every serverless instance shares the database) or FileStore
+(under PORTFOLIO_STORE_DIR, for a single server). Decoded data is also
+kept in a per-process LRU of PORTFOLIO_STORE_LOCAL_CACHE_SIZE entries so
+repeat reads don't touch the backend. Entries unused for
+PORTFOLIO_STORE_TTL seconds are deleted by a PORTFOLIO_STORE_PRUNE_RATE
+fraction of writes, since a prune scans the whole store.
+"""
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import PortfolioDataEntry
+from .rendering import portfolio_data_digest
+
+SESSION_KEY = 'portfolio_key'
+UPDATED_AT_SESSION_KEY = 'portfolio_data_updated_at'
+# Sessions from before the store kept the data itself under this key
+LEGACY_SESSION_KEY = 'portfolio_data'
+
+_local = OrderedDict()
+_local_lock = threading.Lock()
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def encode_payload(data):
+    """Compact JSON, zlib-compressed"""
+    payload = json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+    return zlib.compress(payload.encode('utf-8'))
+
+
+def decode_payload(payload):
+    return json.loads(zlib.decompress(bytes(payload)).decode('utf-8'))
+
+
+class DatabaseStore:
+    """Payloads in the PortfolioDataEntry table"""
+
+    def get(self, key):
+        entry = PortfolioDataEntry.objects.filter(key=key).only('payload', 'last_used_at').first()
+        if entry is None:
+            return None
+        now = timezone.now()
+        if now - entry.last_used_at > timedelta(seconds=settings.PORTFOLIO_STORE_TTL / 10):
+            PortfolioDataEntry.objects.filter(key=key).update(last_used_at=now)
+        return bytes(entry.payload)
+
+    def set(self, key, payload):
+        PortfolioDataEntry.objects.update_or_create(
+            key=key, defaults={'payload': payload, 'last_used_at': timezone.now()}
+        )
+
+    def delete(self, key):
+        PortfolioDataEntry.objects.filter(key=key).delete()
+
+    def prune(self, max_age):
+        cutoff = timezone.now() - timedelta(seconds=max_age)
+        return PortfolioDataEntry.objects.filter(last_used_at__lt=cutoff).delete()[0]
+
+
+class FileStore:
+    """Payloads as files under PORTFOLIO_STORE_DIR (the file's mtime is its last use)"""
+
+    def __init__(self):
+        self.directory = settings.PORTFOLIO_STORE_DIR
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                payload = f.read()
+        except FileNotFoundError:
+            return None
+        os.utime(path)
+        return payload
+
+    def set(self, key, payload):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so readers never see a partial file
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def delete(self, key):
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def prune(self, max_age):
+        cutoff = time.time() - max_age
+        removed = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.unlink(path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+def get_store():
+    """The configured store backend instance"""
+    path = settings.PORTFOLIO_STORE_BACKEND
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = import_string(path)()
+        return store
+
+
+def _remember(key, data):
+    size = settings.PORTFOLIO_STORE_LOCAL_CACHE_SIZE
+    if size <= 0:
+        return
+    with _local_lock:
+        _local[key] = data
+        _local.move_to_end(key)
+        while len(_local) > size:
+            _local.popitem(last=False)
+
+
+def put(data):
+    """
+    Store portfolio data
+
+    Returns:
+        str: Its key (the portfolio_data_digest of the data)
+
+    Raises:
+        DatabaseError or OSError: The backend couldn't save it
+    """
+    key = portfolio_data_digest(data)
+    store = get_store()
+    store.set(key, encode_payload(data))
+    _remember(key, data)
+    if random.random() < settings.PORTFOLIO_STORE_PRUNE_RATE:
+        prune()
+    return key
+
+
+def prune():
+    """
+    Delete entries unused for PORTFOLIO_STORE_TTL seconds
+
+    Returns:
+        int: Entries deleted (0 if the backend is unavailable)
+    """
+    try:
+        return get_store().prune(settings.PORTFOLIO_STORE_TTL)
+    except (DatabaseError, OSError) as e:
+        print(f"DEBUG: Could not prune portfolio data store: {e}")
+        return 0
+
+
+def get(key):
+    """
+    Load portfolio data by key
+
+    The returned dict may be shared with other requests in this process,
+    so treat it as read-only.
+
+    Returns:
+        dict or None: The data, or None if it is unknown or expired
+    """
+    with _local_lock:
+        data = _local.get(key)
+        if data is not None:
+            _local.move_to_end(key)
+            return data
+
+    try:
+        payload = get_store().get(key)
+    except (DatabaseError, OSError) as e:
+        print(f"DEBUG: Portfolio data store unavailable: {e}")
+        return None
+    if payload is None:
+        return None
+    data = decode_payload(payload)
+    _remember(key, data)
+    return data
+
+
+def delete(key):
+    """Remove an entry from the store and this process's cache"""
+    get_store().delete(key)
+    with _local_lock:
+        _local.pop(key, None)
+
+
+def clear_local_cache():
+    with _local_lock:
+        _local.clear()
+
+
+def save_to_session(session, data):
+    """Store `data` and point the session at it, remembering when it changed"""
+    try:
+        session[SESSION_KEY] = put(data)
+        session.pop(LEGACY_SESSION_KEY, None)
+    except (DatabaseError, OSError) as e:
+        # Better a big cookie than losing the user's resume
+        print(f"DEBUG: Could not store portfolio data, keeping it in the session: {e}")
+        session.pop(SESSION_KEY, None)
+        session[LEGACY_SESSION_KEY] = data
+    session[UPDATED_AT_SESSION_KEY] = int(timezone.now().timestamp())
+
+
+def load_from_session(session):
+    """
+    The session's portfolio data
+
+    Returns:
+        tuple: (data, key) - data is None if there is none (or it expired)
+    """
+    key = session.get(SESSION_KEY)
+    if key:
+        return get(key), key
+
+    data = session.get(LEGACY_SESSION_KEY)
+    if not data:
+        return None, None
+    # Move data from an older session into the store
+    updated_at = session.get(UPDATED_AT_SESSION_KEY)
+    save_to_session(session, data)
+    if updated_at:
+        session[UPDATED_AT_SESSION_KEY] = updated_at
+    return data, session.get(SESSION_KEY) or portfolio_data_digest(data)
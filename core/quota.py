@@ -0,0 +1,184 @@
+"""
+Rate limiting and circuit breaking for Gemini requests.
+
+State lives in GeminiQuotaState rows (one per API key fingerprint) and is
+updated under a row lock, so every web and worker process shares it:
+
+- A token bucket per key refills at GEMINI_SYSTEM_KEY_RPM requests per
+  minute for the site's own key and GEMINI_USER_KEY_RPM for user keys.
+  Callers wait for a token for at most GEMINI_RATE_LIMIT_WAIT seconds.
+- A quota error (429) or overload (503) empties the bucket so other
+  requests back off too. After GEMINI_BREAKER_THRESHOLD of them in a row
+  the breaker opens and requests fail immediately until the cooldown (or
+  the server's retry-after hint) has passed.
+
+If the table isn't available the limiter steps aside rather than blocking
+resume processing.
+"""
+import random
+import re
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from .gemini_clients import key_fingerprint
+from .models import GeminiQuotaState
+
+# Backoff between retries: full jitter up to BACKOFF_BASE * 2**attempt, capped
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+# Longest the breaker stays open, however many failures in a row
+BREAKER_MAX_COOLDOWN = 600
+
+_RETRY_IN = re.compile(r'retry in ([\d.]+)\s*s', re.IGNORECASE)
+_RETRY_DELAY = re.compile(r'retry_delay\s*\{\s*seconds:\s*(\d+)')
+
+
+class GeminiUnavailable(Exception):
+    """Raised instead of calling Gemini while the key is rate limited or the breaker is open"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_quota_error(error):
+    """Whether `error` means the upstream is saturated (quota or overload)"""
+    from google.api_core import exceptions as api_exceptions
+
+    if isinstance(error, (api_exceptions.TooManyRequests, api_exceptions.ResourceExhausted,
+                          api_exceptions.ServiceUnavailable)):
+        return True
+    return '429' in str(error)
+
+
+def retry_after_hint(error):
+    """Seconds the server asked us to wait, if it said"""
+    for detail in getattr(error, 'details', None) or []:
+        delay = getattr(detail, 'retry_delay', None)
+        if delay is not None and hasattr(delay, 'seconds'):
+            return delay.seconds + getattr(delay, 'nanos', 0) / 1e9
+    message = str(error)
+    match = _RETRY_IN.search(message) or _RETRY_DELAY.search(message)
+    return float(match.group(1)) if match else None
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Jittered delay before retry number `attempt` (0-based)"""
+    if retry_after:
+        # Honour the hint, spreading retries so they don't all land at once
+        return retry_after + random.uniform(0, BACKOFF_BASE)
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** (attempt + 1)))
+
+
+def _rate_per_second(api_key):
+    per_minute = settings.GEMINI_SYSTEM_KEY_RPM if api_key == settings.GEMINI_API_KEY else settings.GEMINI_USER_KEY_RPM
+    return max(per_minute, 1) / 60.0, max(per_minute, 1)
+
+
+def _locked_state(fingerprint, capacity):
+    """The key's state row, locked; returns it with the current time read after locking"""
+    state, _ = GeminiQuotaState.objects.select_for_update().get_or_create(
+        key_fingerprint=fingerprint, defaults={'tokens': capacity}
+    )
+    return state, timezone.now()
+
+
+def _try_take_token(api_key):
+    """
+    Take a token if one is available
+
+    Returns:
+        float: 0 if a token was taken, else the seconds until one will be
+    """
+    rate, capacity = _rate_per_second(api_key)
+    with transaction.atomic():
+        state, now = _locked_state(key_fingerprint(api_key), capacity)
+        if state.open_until and state.open_until > now:
+            retry_after = (state.open_until - now).total_seconds()
+            raise GeminiUnavailable(
+                f"Gemini is over capacity for this API key. Please try again in {int(retry_after) + 1} seconds.",
+                retry_after=retry_after,
+            )
+
+        if state.refilled_at > now:
+            # Held back until the server's retry-after hint has passed
+            return (state.refilled_at - now).total_seconds() + (1 - state.tokens) / rate
+
+        elapsed = max((now - state.refilled_at).total_seconds(), 0)
+        state.tokens = min(capacity, state.tokens + elapsed * rate)
+        state.refilled_at = now
+        wait = 0.0
+        if state.tokens >= 1:
+            state.tokens -= 1
+        else:
+            wait = (1 - state.tokens) / rate
+        state.save(update_fields=['tokens', 'refilled_at'])
+    return wait
+
+
+def acquire(api_key):
+    """
+    Wait for permission to send one request with `api_key`
+
+    Raises:
+        GeminiUnavailable: The breaker is open, or no token came up within GEMINI_RATE_LIMIT_WAIT
+    """
+    deadline = time.monotonic() + settings.GEMINI_RATE_LIMIT_WAIT
+    while True:
+        try:
+            wait = _try_take_token(api_key)
+        except DatabaseError as e:
+            print(f"DEBUG: Gemini rate limiter unavailable: {e}")
+            return
+        if not wait:
+            return
+        if time.monotonic() + wait > deadline:
+            raise GeminiUnavailable(
+                "Too many resumes are being processed right now. Please try again in a minute.",
+                retry_after=wait,
+            )
+        # Jitter so waiting requests don't wake up together
+        time.sleep(wait + random.uniform(0, min(wait, BACKOFF_BASE)))
+
+
+def record_success(api_key):
+    try:
+        GeminiQuotaState.objects.filter(
+            key_fingerprint=key_fingerprint(api_key), consecutive_failures__gt=0
+        ).update(consecutive_failures=0, open_until=None)
+    except DatabaseError:
+        pass
+
+
+def record_quota_error(api_key, retry_after=None):
+    """
+    Note a quota/overload error: drain the bucket and maybe open the breaker
+
+    Returns:
+        bool: True if the breaker is now open
+    """
+    _, capacity = _rate_per_second(api_key)
+    try:
+        with transaction.atomic():
+            state, now = _locked_state(key_fingerprint(api_key), capacity)
+            state.consecutive_failures += 1
+            state.tokens = 0
+            state.refilled_at = now
+            if retry_after:
+                # Nobody gets a token before the server's hint
+                state.refilled_at = now + timedelta(seconds=retry_after)
+
+            failures_over = state.consecutive_failures - settings.GEMINI_BREAKER_THRESHOLD
+            if failures_over >= 0:
+                cooldown = min(settings.GEMINI_BREAKER_COOLDOWN * 2 ** failures_over, BREAKER_MAX_COOLDOWN)
+                state.open_until = now + timedelta(seconds=max(cooldown, retry_after or 0))
+                print(f"DEBUG: Gemini circuit breaker open for {state.key_fingerprint} until {state.open_until}")
+            state.save()
+            return state.open_until is not None and state.open_until > now
+    except DatabaseError as e:
+        print(f"DEBUG: Could not record Gemini quota error: {e}")
+        return False
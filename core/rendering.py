@@ -0,0 +1,126 @@
+"""
+Rendering helpers for the portfolio templates in core/templates/portfolios/.
+
+Each portfolio template is compiled once per process and reused by
+preview_portfolio and download_portfolio. In DEBUG the file's mtime is
+checked on every lookup so edits show up immediately; in production the
+compiled template is kept for the life of the process.
+
+Rendered HTML is cached as well, keyed by template slug, template version
+and a digest of the portfolio data, since the same inputs always produce
+the same page.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.template import Context, Template
+
+PORTFOLIO_TEMPLATES_DIR = os.path.join(settings.BASE_DIR, 'core', 'templates', 'portfolios')
+
+CompiledPortfolioTemplate = namedtuple('CompiledPortfolioTemplate', ['template', 'version'])
+
+_compiled_templates = {}
+_compile_lock = threading.Lock()
+
+
+def portfolio_template_dir(template_slug):
+    """Return the directory holding a portfolio template and its assets"""
+    return os.path.join(PORTFOLIO_TEMPLATES_DIR, template_slug)
+
+
+def get_portfolio_template(template_slug):
+    """
+    Return the compiled template for a slug
+
+    Returns:
+        CompiledPortfolioTemplate or None: The compiled template and its
+        version (the source file's mtime in ns), or None if it does not exist
+    """
+    cached = _compiled_templates.get(template_slug)
+    if cached is not None and not settings.DEBUG:
+        return cached
+
+    template_path = os.path.join(portfolio_template_dir(template_slug), 'index.html')
+    try:
+        version = os.stat(template_path).st_mtime_ns
+    except FileNotFoundError:
+        _compiled_templates.pop(template_slug, None)
+        return None
+
+    if cached is not None and cached.version == version:
+        return cached
+
+    with _compile_lock:
+        # Another thread may have compiled it while we waited
+        cached = _compiled_templates.get(template_slug)
+        if cached is not None and cached.version == version:
+            return cached
+
+        with open(template_path, 'r') as f:
+            compiled = CompiledPortfolioTemplate(Template(f.read()), version)
+        _compiled_templates[template_slug] = compiled
+    return compiled
+
+
+def portfolio_data_digest(portfolio_data):
+    """Stable SHA-256 of the portfolio data, independent of key order"""
+    payload = json.dumps(portfolio_data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def render_portfolio(template_slug, portfolio_data, digest=None):
+    """
+    Render a portfolio template, serving repeat renders from the cache
+
+    Args:
+        template_slug: Slug of the portfolio template
+        portfolio_data: Structured portfolio data used as the template context
+        digest: Precomputed portfolio_data_digest(portfolio_data), if available
+
+    Returns:
+        str or None: Rendered HTML, or None if the template does not exist
+    """
+    compiled = get_portfolio_template(template_slug)
+    if compiled is None:
+        return None
+
+    if digest is None:
+        digest = portfolio_data_digest(portfolio_data)
+    cache_key = f'portfolio_render:{template_slug}:{compiled.version}:{digest}'
+
+    rendered_html = cache.get(cache_key)
+    if rendered_html is None:
+        rendered_html = compiled.template.render(Context(portfolio_data))
+        cache.set(cache_key, rendered_html, settings.PORTFOLIO_RENDER_CACHE_TTL)
+    return rendered_html
+
+
+def available_template_slugs():
+    """Slugs of active templates, falling back to what is on disk if the DB is empty"""
+    from .models import PortfolioTemplate
+
+    try:
+        slugs = list(
+            PortfolioTemplate.objects.filter(is_active=True).values_list('slug', flat=True)
+        )
+    except DatabaseError:
+        slugs = []
+
+    if not slugs and os.path.isdir(PORTFOLIO_TEMPLATES_DIR):
+        slugs = sorted(os.listdir(PORTFOLIO_TEMPLATES_DIR))
+    return slugs
+
+
+def warm_portfolio_templates():
+    """Compile every available portfolio template ahead of the first request"""
+    warmed = []
+    for slug in available_template_slugs():
+        if get_portfolio_template(slug) is not None:
+            warmed.append(slug)
+    return warmed
@@ -0,0 +1,210 @@
+"""
+The portfolio data schema.
+
+PORTFOLIO_SCHEMA is the single definition of the JSON that Gemini returns
+and the portfolio templates consume. It is sent to Gemini as the response
+schema (with a JSON response MIME type), rendered into the example shown
+in the prompt, and used to validate and coerce what comes back. Fields
+that are missing or can't be coerced are reported by name, so only those
+need to be asked for again.
+"""
+import json
+
+from .streaming_json import TopLevelFieldParser
+
+
+def _string(example):
+    return {'type': 'string', 'example': example}
+
+
+def _string_list(*examples):
+    return {'type': 'array', 'items': {'type': 'string'}, 'example': list(examples)}
+
+
+def _object(**properties):
+    return {'type': 'object', 'properties': properties, 'required': list(properties)}
+
+
+def _object_list(**properties):
+    return {'type': 'array', 'items': _object(**properties)}
+
+
+PORTFOLIO_SCHEMA = _object(
+    name=_string('Full Name'),
+    tagline=_string('Professional Title or Tagline'),
+    bio=_string('Professional bio/about me section'),
+    contact=_object(
+        email=_string('email@example.com'),
+        phone=_string('+1234567890'),
+        linkedin=_string('linkedin.com/in/username'),
+        github=_string('github.com/username'),
+        website=_string('yourwebsite.com'),
+    ),
+    skills=_string_list('skill1', 'skill2', 'skill3'),
+    experience=_object_list(
+        role=_string('Job Title'),
+        company=_string('Company Name'),
+        duration=_string('Jan 2020 - Present'),
+        description=_string('Brief description of responsibilities and achievements'),
+        technologies=_string_list('tech1', 'tech2'),
+    ),
+    projects=_object_list(
+        name=_string('Project Name'),
+        duration=_string('2023'),
+        description=_string('Project description highlighting key features and impact'),
+        technologies=_string_list('tech1', 'tech2'),
+        link=_string('github.com/project or demo-link.com'),
+    ),
+    education=_object_list(
+        degree=_string('Degree Name'),
+        institution=_string('University Name'),
+        duration=_string('2015 - 2019'),
+        details=_string('GPA, honors, relevant coursework'),
+    ),
+)
+
+PORTFOLIO_FIELDS = list(PORTFOLIO_SCHEMA['properties'])
+
+
+def field_schema(fields=None):
+    """The schema restricted to some top-level fields (default: all of them)"""
+    fields = PORTFOLIO_FIELDS if fields is None else fields
+    properties = {key: PORTFOLIO_SCHEMA['properties'][key] for key in fields}
+    return {'type': 'object', 'properties': properties, 'required': list(properties)}
+
+
+def response_schema(schema):
+    """Copy of `schema` in the OpenAPI subset Gemini accepts (no examples)"""
+    cleaned = {key: value for key, value in schema.items() if key != 'example'}
+    if 'items' in cleaned:
+        cleaned['items'] = response_schema(cleaned['items'])
+    if 'properties' in cleaned:
+        cleaned['properties'] = {key: response_schema(value) for key, value in cleaned['properties'].items()}
+    return cleaned
+
+
+def example(schema):
+    """Example value for `schema`, as shown to the model in the prompt"""
+    if 'example' in schema:
+        return schema['example']
+    if schema['type'] == 'object':
+        return {key: example(value) for key, value in schema['properties'].items()}
+    if schema['type'] == 'array':
+        return [example(schema['items'])]
+    return ''
+
+
+def example_json(fields=None):
+    return json.dumps(example(field_schema(fields)), indent=4)
+
+
+def _default(schema):
+    if schema['type'] == 'object':
+        return {key: _default(value) for key, value in schema['properties'].items()}
+    if schema['type'] == 'array':
+        return []
+    return ''
+
+
+def coerce(schema, value):
+    """
+    Coerce `value` to `schema`
+
+    Returns:
+        tuple: (coerced value, False if the value couldn't be made to fit)
+    """
+    kind = schema['type']
+    if value is None:
+        return _default(schema), kind != 'object'
+
+    if kind == 'string':
+        if isinstance(value, str):
+            return value.strip(), True
+        if isinstance(value, (int, float, bool)):
+            return str(value), True
+        if isinstance(value, list) and all(isinstance(item, str) for item in value):
+            return ', '.join(value), True
+        return _default(schema), False
+
+    if kind == 'array':
+        item_schema = schema['items']
+        if isinstance(value, str) and item_schema['type'] == 'string':
+            # "Python, Django, SQL" instead of a list
+            return [item.strip() for item in value.split(',') if item.strip()], True
+        if not isinstance(value, list):
+            return [], False
+        items = []
+        valid = True
+        for item in value:
+            item, item_valid = coerce(item_schema, item)
+            if item_valid:
+                items.append(item)
+            valid = valid and item_valid
+        return items, valid
+
+    if not isinstance(value, dict):
+        return _default(schema), False
+    coerced = {}
+    valid = True
+    for key, property_schema in schema['properties'].items():
+        if key in value:
+            coerced[key], property_valid = coerce(property_schema, value[key])
+            valid = valid and property_valid
+        else:
+            # A missing nested property isn't worth another request
+            coerced[key] = _default(property_schema)
+    return coerced, valid
+
+
+def coerce_field(key, value):
+    """Coerce one top-level field; unknown fields are (None, False)"""
+    if key not in PORTFOLIO_SCHEMA['properties']:
+        return None, False
+    return coerce(PORTFOLIO_SCHEMA['properties'][key], value)
+
+
+def validate_portfolio_data(data, fields=None):
+    """
+    Coerce portfolio data to the schema
+
+    Args:
+        data: Decoded JSON from the model
+        fields: Top-level fields to check (default: all of them)
+
+    Returns:
+        tuple: (data with every requested field present, list of fields that were missing or invalid)
+    """
+    data = data if isinstance(data, dict) else {}
+    cleaned = {}
+    invalid = []
+    for key in PORTFOLIO_FIELDS if fields is None else fields:
+        cleaned[key], valid = coerce_field(key, data.get(key))
+        if key not in data or not valid:
+            invalid.append(key)
+    return cleaned, invalid
+
+
+def decode_response(text):
+    """
+    Decode a model response into a dict, salvaging what it can
+
+    Strips markdown fences; if the JSON is malformed or cut off, the
+    top-level fields that were complete are still returned.
+    """
+    text = text.strip()
+    if text.startswith('```'):
+        text = text.split('```')[1]
+        if text.startswith('json'):
+            text = text[4:]
+    try:
+        data = json.loads(text)
+        return data if isinstance(data, dict) else {}
+    except ValueError:
+        pass
+
+    parser = TopLevelFieldParser()
+    try:
+        parser.feed(text)
+    except ValueError:
+        pass
+    return parser.fields
@@ -0,0 +1,68 @@
+"""
+Heuristic splitting of resume text into sections.
+
+Lines that look like a resume heading ("Work Experience", "PROJECTS",
+"Education:") start a new section. Sections are grouped into the parts
+that are extracted with separate Gemini requests; everything before the
+first heading (name, contact details) and the summary/skills sections
+belong to the profile.
+"""
+import re
+
+# Portfolio fields filled in by each group's request
+SECTION_FIELDS = {
+    'profile': ['name', 'tagline', 'bio', 'contact', 'skills'],
+    'experience': ['experience'],
+    'projects': ['projects'],
+    'education': ['education'],
+}
+
+_HEADINGS = {
+    'profile': [
+        'summary', 'professional summary', 'profile', 'about', 'about me', 'objective', 'career objective',
+        'skills', 'technical skills', 'core skills', 'key skills', 'core competencies', 'contact',
+        'languages', 'interests',
+    ],
+    'experience': [
+        'experience', 'work experience', 'professional experience', 'employment', 'employment history',
+        'work history', 'career history', 'internships', 'internship experience',
+    ],
+    'projects': ['projects', 'personal projects', 'academic projects', 'key projects', 'selected projects'],
+    'education': [
+        'education', 'academic background', 'education and training', 'qualifications',
+        'certifications', 'education & certifications',
+    ],
+}
+_HEADING_GROUPS = {heading: group for group, headings in _HEADINGS.items() for heading in headings}
+_HEADING_MAX_LENGTH = 40
+
+
+def _heading_group(line):
+    """The group a heading line starts, or None if the line isn't a heading"""
+    line = line.strip()
+    if not line or len(line) > _HEADING_MAX_LENGTH:
+        return None
+    key = re.sub(r'[^a-z& ]', '', line.lower().rstrip(':')).strip()
+    return _HEADING_GROUPS.get(re.sub(r'\s+', ' ', key))
+
+
+def split_sections(text):
+    """
+    Split resume text into section groups
+
+    Args:
+        text: Cleaned resume text
+
+    Returns:
+        dict: Group name (see SECTION_FIELDS) to the text of its sections;
+            groups without a heading in the resume are left out
+    """
+    groups = {'profile': []}
+    current = 'profile'
+    for line in text.splitlines():
+        group = _heading_group(line)
+        if group:
+            current = group
+            groups.setdefault(current, [])
+        groups[current].append(line)
+    return {group: '\n'.join(lines).strip() for group, lines in groups.items() if ''.join(lines).strip()}
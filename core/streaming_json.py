@@ -0,0 +1,159 @@
+"""
+Incremental parsing of a streamed JSON object.
+
+Gemini streams the portfolio JSON in chunks. TopLevelFieldParser is fed
+those chunks and hands back each top-level field as soon as its value is
+complete, so "name", "tagline" and "bio" are available long before the
+experience and project lists have been generated. Anything before the
+opening brace (such as a ```json fence) is ignored.
+"""
+import json
+
+_WHITESPACE = ' \t\r\n'
+
+
+class TopLevelFieldParser:
+    """Yield (key, value) pairs of a JSON object while it is still arriving"""
+
+    def __init__(self):
+        self.fields = {}
+        self._buffer = ''
+        self._pos = 0
+        self._state = 'start'
+        self._key = None
+        self._value_start = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    @property
+    def done(self):
+        return self._state == 'end'
+
+    def feed(self, chunk):
+        """
+        Add the next chunk of text
+
+        Returns:
+            list: (key, value) pairs completed by this chunk, in order
+        """
+        self._buffer += chunk
+        completed = []
+        while self._state != 'end':
+            field = self._step()
+            if field is False:
+                break
+            if field is not None:
+                completed.append(field)
+        return completed
+
+    def _skip_whitespace(self):
+        while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+            self._pos += 1
+        return self._pos < len(self._buffer)
+
+    def _string_end(self, start):
+        """Index just past the string starting at `start`, or None if incomplete"""
+        index = start + 1
+        buffer = self._buffer
+        while index < len(buffer):
+            char = buffer[index]
+            if char == '\\':
+                index += 2
+                continue
+            if char == '"':
+                return index + 1
+            index += 1
+        return None
+
+    def _step(self):
+        """
+        Advance the state machine by one token
+
+        Returns False when more input is needed, a (key, value) pair when a
+        field was completed, and None otherwise.
+        """
+        buffer = self._buffer
+        if self._state == 'start':
+            brace = buffer.find('{', self._pos)
+            if brace == -1:
+                self._pos = len(buffer)
+                return False
+            self._pos = brace + 1
+            self._state = 'key'
+            return None
+
+        if self._state == 'key':
+            if not self._skip_whitespace():
+                return False
+            char = buffer[self._pos]
+            if char == ',':
+                self._pos += 1
+            elif char == '}':
+                self._pos += 1
+                self._state = 'end'
+            elif char == '"':
+                end = self._string_end(self._pos)
+                if end is None:
+                    return False
+                self._key = json.loads(buffer[self._pos:end])
+                self._pos = end
+                self._state = 'colon'
+            else:
+                raise ValueError(f"Unexpected {char!r} in JSON object at {self._pos}")
+            return None
+
+        if self._state == 'colon':
+            if not self._skip_whitespace():
+                return False
+            if buffer[self._pos] != ':':
+                raise ValueError(f"Expected ':' in JSON object at {self._pos}")
+            self._pos += 1
+            self._state = 'value'
+            self._value_start = None
+            self._depth = 0
+            self._in_string = self._escaped = False
+            return None
+
+        # state == 'value': scan to the end of the value, resuming where we stopped
+        if self._value_start is None:
+            if not self._skip_whitespace():
+                return False
+            self._value_start = self._pos
+
+        index = self._pos
+        while index < len(buffer):
+            char = buffer[index]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 0:
+                        return self._complete_value(index + 1)
+            elif char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                if self._depth == 0:
+                    # End of the enclosing object after a scalar value
+                    return self._complete_value(index)
+                self._depth -= 1
+                if self._depth == 0:
+                    return self._complete_value(index + 1)
+            elif char == ',' and self._depth == 0:
+                return self._complete_value(index)
+            index += 1
+        self._pos = index
+        return False
+
+    def _complete_value(self, end):
+        raw = self._buffer[self._value_start:end].strip()
+        self._pos = end
+        self._state = 'key'
+        value = json.loads(raw)
+        self.fields[self._key] = value
+        return self._key, value
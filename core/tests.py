@@ -1,3 +1,727 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+import time
+import zipfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import extraction_cache, firebase, jobs, pdf_text, portfolio_store, utils, views
+from .gemini_clients import build_request, response_text
+from .hyperloglog import HyperLogLog
+from .llm_backends import GeminiBackend
+from .loadtest import make_resume_pdf, run_load_test
+from .middleware import VisitBuffer, _session_key
+from .models import (
+    DailyVisitStat, ExtractionCacheEntry, GeminiQuotaState, PortfolioDataEntry, PortfolioRequest, UserProfile, Visitor,
+)
+from .packaging import entry_from_bytes, entry_from_file, portfolio_zip_entries, stream_zip, zip_size
+from .quota import GeminiUnavailable
+from .rendering import available_template_slugs
+from .schema import PORTFOLIO_FIELDS, PORTFOLIO_SCHEMA, coerce, decode_response, example, validate_portfolio_data
+from .streaming_json import TopLevelFieldParser
+from .text_cleanup import clean_resume_pages
+from .visitor_stats import rebuild_visit_rollups, record_visits
+
+
+class TextCleanupTests(SimpleTestCase):
+    def test_two_pages_keep_lines_that_look_repeated(self):
+        pages = [
+            "Jane Doe\nEngineer\nAcme Corp\nBuilt the billing system\nJan 2020 - Present\nSkills: Python, SQL",
+            "Beta Inc\nAnalyst\nBuilt dashboards\nRan reporting\nJan 2018 - Present\nSkills: Python, SQL",
+        ]
+        text, stats = clean_resume_pages(pages)
+        self.assertEqual(text.count('Python, SQL'), 2)
+        self.assertIn('Jan 2020 - Present', text)
+        self.assertIn('Jan 2018 - Present', text)
+        self.assertEqual(stats.repeated_lines, 0)
+
+    def test_dates_are_not_treated_as_page_numbers(self):
+        pages = [
+            "Jane Doe\nEngineer\nAcme Corp\nBuilt the billing system\nJan 2020 - Present",
+            "Jane Doe\nAnalyst\nBeta Inc\nBuilt dashboards\nJan 2018 - Present",
+            "Jane Doe\nIntern\nGamma LLC\nWrote tests\nJan 2016 - Present",
+        ]
+        text, stats = clean_resume_pages(pages)
+        for year in ('2020', '2018', '2016'):
+            self.assertIn(f'Jan {year} - Present', text)
+        # The running header is kept once
+        self.assertEqual(text.count('Jane Doe'), 1)
+        self.assertEqual(stats.repeated_lines, 2)
+
+    def test_page_counters_and_numbers_are_removed(self):
+        pages = [
+            f"Jane Doe\nExperience {number}\nJane Doe - Page {number} of 3\n{number}"
+            for number in (1, 2, 3)
+        ]
+        text, stats = clean_resume_pages(pages)
+        self.assertEqual(text.count('Page'), 1)
+        self.assertEqual(stats.page_numbers, 3)
+        for number in (1, 2, 3):
+            self.assertIn(f'Experience {number}', text)
+
+    def test_hyphenation_and_boilerplate(self):
+        text, stats = clean_resume_pages([
+            "Resume\nBuilt a distri-\nbuted cache and a self-\nservice portal\nReferences available upon request",
+        ])
+        self.assertEqual(text, "Built a distributed cache and a self-service portal")
+        self.assertEqual(stats.boilerplate_lines, 2)
+        self.assertEqual(stats.hyphens_joined, 2)
+
+
+@override_settings(PDF_PARALLEL_MIN_PAGES=2)
+class PdfExtractionTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.pdf = make_resume_pdf(pages=6)
+
+    def tearDown(self):
+        # The pool is sized from the settings when it is first created
+        if pdf_text._executor is not None:
+            pdf_text._executor.shutdown()
+            pdf_text._reset_executor()
+
+    def _extract(self, workers, **budget):
+        budget = {'max_pages': 0, 'max_chars': 0, **budget}
+        with override_settings(PDF_EXTRACT_WORKERS=workers):
+            return pdf_text.extract_pages(io.BytesIO(self.pdf), **budget)
+
+    def test_parallel_matches_serial(self):
+        serial_texts, serial_report = self._extract(1)
+        with mock.patch.object(pdf_text, '_iter_serial', wraps=pdf_text._iter_serial) as iter_serial:
+            texts, report = self._extract(2)
+        iter_serial.assert_not_called()
+        self.assertEqual(len(serial_texts), 6)
+        self.assertEqual(texts, serial_texts)
+        self.assertEqual(report.extracted_pages, [1, 2, 3, 4, 5, 6])
+        self.assertEqual(report.dropped_pages, [])
+        self.assertEqual(report.chars, serial_report.chars)
+
+    def test_falls_back_to_serial_when_the_pool_is_unavailable(self):
+        serial_texts, _ = self._extract(1)
+        with mock.patch.object(pdf_text, '_get_executor', side_effect=OSError('no /dev/shm')):
+            texts, report = self._extract(2)
+        self.assertEqual(texts, serial_texts)
+        self.assertEqual(report.extracted_pages, [1, 2, 3, 4, 5, 6])
+
+    def test_page_limit(self):
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                texts, report = self._extract(workers, max_pages=2)
+                self.assertEqual(len(texts), 2)
+                self.assertEqual(report.page_count, 6)
+                self.assertEqual(report.extracted_pages, [1, 2])
+                self.assertEqual(report.dropped_pages, [3, 4, 5, 6])
+                self.assertEqual(
+                    {page.status for page in report.pages[2:]}, {pdf_text.PAGE_OVER_PAGE_LIMIT},
+                )
+                self.assertIn('dropped pages: 3-6', report.summary())
+
+    def test_char_budget_stops_early(self):
+        serial_texts, _ = self._extract(1)
+        # Reached partway through page 2
+        max_chars = len(serial_texts[0]) + 1
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                texts, report = self._extract(workers, max_chars=max_chars)
+                self.assertEqual(texts, serial_texts[:2])
+                self.assertEqual(report.extracted_pages, [1, 2])
+                self.assertEqual(report.dropped_pages, [3, 4, 5, 6])
+                self.assertEqual(
+                    {page.status for page in report.pages[2:]}, {pdf_text.PAGE_OVER_CHAR_BUDGET},
+                )
+
+    def test_page_limit_before_char_budget(self):
+        serial_texts, _ = self._extract(1)
+        texts, report = self._extract(1, max_pages=4, max_chars=len(serial_texts[0]) + len(serial_texts[1]) + 1)
+        self.assertEqual(len(texts), 3)
+        self.assertEqual(
+            [page.status for page in report.pages[3:]],
+            [pdf_text.PAGE_OVER_CHAR_BUDGET, pdf_text.PAGE_OVER_PAGE_LIMIT, pdf_text.PAGE_OVER_PAGE_LIMIT],
+        )
+
+
+@override_settings(EXTRACTION_CACHE_ENABLED=True, EXTRACTION_CACHE_TTL=3600, EXTRACTION_CACHE_MAX_ENTRIES=1000)
+class ExtractionCacheTests(TestCase):
+    def _stats_delta(self, before):
+        after = extraction_cache.cache_stats()
+        return {counter: after[counter] - before[counter] for counter in ('hits', 'misses', 'stores', 'evictions')}
+
+    def test_keys_ignore_whitespace_but_not_text_or_prompt_version(self):
+        extraction_cache.store_portfolio_data("Jane Doe\nEngineer", '1', {'name': 'Jane Doe'})
+        self.assertEqual(
+            extraction_cache.get_cached_portfolio_data("  Jane   Doe\n\n\tEngineer \n", '1'), {'name': 'Jane Doe'},
+        )
+        self.assertIsNone(extraction_cache.get_cached_portfolio_data("Jane Doe Engineer", '2'))
+        self.assertIsNone(extraction_cache.get_cached_portfolio_data("Jane Doe Engineering", '1'))
+        self.assertIsNone(extraction_cache.get_cached_portfolio_data("JaneDoe Engineer", '1'))
+
+    def test_expired_entries_are_misses_and_deleted(self):
+        extraction_cache.store_portfolio_data("Jane Doe", '1', {'name': 'Jane Doe'})
+        ExtractionCacheEntry.objects.update(created_at=timezone.now() - timedelta(seconds=3599))
+        self.assertEqual(extraction_cache.get_cached_portfolio_data("Jane Doe", '1'), {'name': 'Jane Doe'})
+
+        ExtractionCacheEntry.objects.update(created_at=timezone.now() - timedelta(seconds=3601))
+        self.assertIsNone(extraction_cache.get_cached_portfolio_data("Jane Doe", '1'))
+        self.assertFalse(ExtractionCacheEntry.objects.exists())
+
+    @override_settings(EXTRACTION_CACHE_MAX_ENTRIES=2)
+    def test_trims_least_recently_used_entries(self):
+        for name in ('A', 'B'):
+            extraction_cache.store_portfolio_data(name, '1', {'name': name})
+        now = timezone.now()
+        ExtractionCacheEntry.objects.filter(content_hash=extraction_cache.content_key('A', '1')).update(
+            last_used_at=now - timedelta(minutes=2),
+        )
+        ExtractionCacheEntry.objects.filter(content_hash=extraction_cache.content_key('B', '1')).update(
+            last_used_at=now - timedelta(minutes=1),
+        )
+        # Reading A makes B the least recently used
+        self.assertEqual(extraction_cache.get_cached_portfolio_data('A', '1'), {'name': 'A'})
+
+        before = extraction_cache.cache_stats()
+        extraction_cache.store_portfolio_data('C', '1', {'name': 'C'})
+        self.assertEqual(self._stats_delta(before)['evictions'], 1)
+        self.assertEqual(
+            set(ExtractionCacheEntry.objects.values_list('content_hash', flat=True)),
+            {extraction_cache.content_key('A', '1'), extraction_cache.content_key('C', '1')},
+        )
+        self.assertEqual(ExtractionCacheEntry.objects.get(content_hash=extraction_cache.content_key('A', '1')).hit_count, 1)
+
+    def test_counters(self):
+        before = extraction_cache.cache_stats()
+        extraction_cache.get_cached_portfolio_data('Jane Doe', '1')
+        extraction_cache.store_portfolio_data('Jane Doe', '1', {'name': 'Jane Doe'})
+        extraction_cache.get_cached_portfolio_data('Jane Doe', '1')
+        extraction_cache.get_cached_portfolio_data('Jane  Doe', '1')
+        self.assertEqual(self._stats_delta(before), {'hits': 2, 'misses': 1, 'stores': 1, 'evictions': 0})
+
+        with mock.patch.dict(extraction_cache._stats, {'hits': 3, 'misses': 1}):
+            self.assertEqual(extraction_cache.cache_stats()['hit_rate'], 0.75)
+
+    @override_settings(EXTRACTION_CACHE_ENABLED=False)
+    def test_disabled(self):
+        extraction_cache.store_portfolio_data('Jane Doe', '1', {'name': 'Jane Doe'})
+        self.assertFalse(ExtractionCacheEntry.objects.exists())
+        self.assertIsNone(extraction_cache.get_cached_portfolio_data('Jane Doe', '1'))
+
+
+class QuotaErrorBackend:
+    """LLM backend whose every call fails with a 429 asking to retry in `retry_in` seconds"""
+
+    def __init__(self, retry_in):
+        self.retry_in = retry_in
+        self.calls = 0
+
+    def generate(self, api_key, prompt, fields=None):
+        self.calls += 1
+        raise Exception(f"429 Resource exhausted. Please retry in {self.retry_in}s.")
+
+
+@mock.patch.object(utils, 'record_success')
+@mock.patch.object(utils, 'record_quota_error', return_value=False)
+@mock.patch.object(utils, 'acquire')
+class GenerateRetryTests(SimpleTestCase):
+    def _generate(self, backend):
+        with mock.patch.object(utils, 'get_llm_backend', return_value=backend), \
+                mock.patch('time.sleep') as sleep:
+            with self.assertRaises(GeminiUnavailable) as raised:
+                utils._generate('key', 'prompt')
+        return raised.exception, sleep
+
+    @override_settings(GEMINI_MAX_RETRIES=5, GEMINI_RETRY_BUDGET=10)
+    def test_hint_past_the_budget_fails_without_waiting(self, acquire, record_quota_error, record_success):
+        backend = QuotaErrorBackend(retry_in=42)
+        error, sleep = self._generate(backend)
+        self.assertEqual(backend.calls, 1)
+        sleep.assert_not_called()
+        self.assertEqual(error.retry_after, 42)
+
+    @override_settings(GEMINI_MAX_RETRIES=3, GEMINI_RETRY_BUDGET=60)
+    def test_retries_within_the_budget(self, acquire, record_quota_error, record_success):
+        backend = QuotaErrorBackend(retry_in=1)
+        error, sleep = self._generate(backend)
+        self.assertEqual(backend.calls, 3)
+        self.assertEqual(sleep.call_count, 2)
+
+    @override_settings(GEMINI_MAX_RETRIES=0)
+    def test_no_retries_still_calls_once(self, acquire, record_quota_error, record_success):
+        backend = QuotaErrorBackend(retry_in=1)
+        self._generate(backend)
+        self.assertEqual(backend.calls, 1)
+
+
+class VisitBufferTests(TestCase):
+    def test_signed_cookie_session_key_fits_the_column(self):
+        request = RequestFactory().get('/')
+        request.session = mock.Mock(session_key='x' * 300)
+        session_key = _session_key(request)
+        self.assertEqual(len(session_key), Visitor._meta.get_field('session_key').max_length)
+        self.assertEqual(session_key, _session_key(request))
+
+        request.session = mock.Mock(session_key='abc123')
+        self.assertEqual(_session_key(request), 'abc123')
+
+    def test_failed_bulk_insert_saves_rows_one_by_one(self):
+        buffer = VisitBuffer(max_size=10, flush_size=10, flush_interval=60)
+        buffer._ensure_thread = lambda: None
+        for path in ('/a', '/b'):
+            buffer.add(Visitor(ip_address='127.0.0.1', path=path))
+        with mock.patch.object(Visitor.objects, 'bulk_create', side_effect=Exception('value too long')):
+            self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(Visitor.objects.count(), 2)
+
+
+@mock.patch.object(views, 'JOB_EVENTS_STREAM_SECONDS', 0)
+class JobEventStreamTests(TestCase):
+    def setUp(self):
+        self.job = PortfolioRequest.objects.create(
+            status=PortfolioRequest.STATUS_PROCESSING,
+            partial_data={'name': 'Jane Doe', 'skills': ['Python']},
+        )
+
+    def test_stream_ends_after_its_window(self):
+        events = list(views._job_event_stream(self.job.pk))
+        self.assertEqual(events[0], 'retry: 1000\n\n')
+        self.assertEqual(len(events), 3)
+        self.assertIn('id: name\nevent: field', events[1])
+        self.assertIn('id: name,skills\nevent: field', events[2])
+
+    def test_reconnect_skips_fields_already_sent(self):
+        events = list(views._job_event_stream(self.job.pk, last_event_id='name'))
+        self.assertEqual(len(events), 2)
+        self.assertIn('"key": "skills"', events[1])
+
+    def test_finished_job(self):
+        PortfolioRequest.objects.filter(pk=self.job.pk).update(status=PortfolioRequest.STATUS_DONE)
+        events = list(views._job_event_stream(self.job.pk, last_event_id='name,skills'))
+        self.assertEqual(events[1:], ['event: done\ndata: {"status": "done"}\n\n'])
+
+
+class LoadTestTests(TransactionTestCase):
+    def test_run_deletes_what_it_created(self):
+        results = run_load_test(users=1, iterations=2, settings_overrides={
+            'LLM_BACKEND': 'core.llm_backends.FakeBackend',
+            'FAKE_LLM_LATENCY': 0,
+            'FAKE_LLM_ERROR_RATE': 0,
+            'GEMINI_API_KEY': 'loadtest-key',
+        })
+        self.assertEqual(results['flows'], 2, results['error_samples'])
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(ExtractionCacheEntry.objects.exists())
+        self.assertFalse(PortfolioDataEntry.objects.exists())
+        self.assertFalse(GeminiQuotaState.objects.exists())
+
+
+@mock.patch.object(firebase, 'ensure_firebase_app')
+class FirebaseTokenCacheTests(SimpleTestCase):
+    def setUp(self):
+        firebase._tokens.clear()
+
+    def test_claims_are_cached_until_the_token_expires(self, ensure_firebase_app):
+        claims = {'uid': 'abc', 'exp': time.time() + 3600}
+        with mock.patch('firebase_admin.auth.verify_id_token', return_value=claims) as verify:
+            self.assertEqual(firebase.verify_id_token('token'), claims)
+            self.assertEqual(firebase.verify_id_token('token'), claims)
+            verify.assert_called_once_with('token')
+            firebase.verify_id_token('other-token')
+            self.assertEqual(verify.call_count, 2)
+
+    def test_expired_claims_are_verified_again(self, ensure_firebase_app):
+        with mock.patch('firebase_admin.auth.verify_id_token', return_value={'uid': 'abc', 'exp': time.time() - 1}):
+            firebase.verify_id_token('token')
+        with mock.patch('firebase_admin.auth.verify_id_token', side_effect=ValueError('Token expired')):
+            with self.assertRaises(ValueError):
+                firebase.verify_id_token('token')
+
+
+class HyperLogLogTests(SimpleTestCase):
+    def test_estimates_within_error_bounds(self):
+        for count in (10, 1000, 50000):
+            sketch = HyperLogLog()
+            sketch.update(f'192.0.2.{number}' for number in range(count))
+            # Adding values again doesn't change the estimate
+            sketch.update(f'192.0.2.{number}' for number in range(count // 2))
+            self.assertLessEqual(abs(sketch.count() - count), max(1, 4 * sketch.error_rate * count), count)
+
+    def test_union_matches_a_single_sketch(self):
+        parts = [HyperLogLog() for _ in range(3)]
+        whole = HyperLogLog()
+        for number in range(6000):
+            # Overlapping ranges: each value lands in up to two parts
+            parts[number % 3].add(number)
+            parts[(number + 1) % 3].add(number)
+            whole.add(number)
+        self.assertEqual(HyperLogLog.union(parts).registers, whole.registers)
+        self.assertEqual(HyperLogLog().merge(parts[0]).merge(parts[1]).merge(parts[2]).count(), whole.count())
+        self.assertEqual(HyperLogLog.union([]).count(), 0)
+        with self.assertRaises(ValueError):
+            HyperLogLog.union([HyperLogLog(10), HyperLogLog(12)])
+
+    def test_serialization_round_trip(self):
+        sketch = HyperLogLog(precision=10)
+        sketch.update(range(500))
+        restored = HyperLogLog.from_bytes(memoryview(sketch.to_bytes()))
+        self.assertEqual(restored.precision, 10)
+        self.assertEqual(restored.registers, sketch.registers)
+        self.assertEqual(restored.count(), sketch.count())
+
+
+class StreamZipTests(TestCase):
+    def _read(self, entries):
+        archive = b''.join(stream_zip(entries))
+        self.assertEqual(len(archive), zip_size(entries))
+        with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+            self.assertIsNone(zf.testzip())
+            return {info.filename: zf.read(info) for info in zf.infolist()}
+
+    @override_settings(ZIP_ASSET_MEMORY_LIMIT=0)
+    def test_archive_is_readable_and_its_size_is_exact(self):
+        html = '<html>' + '<p>Portfolio</p>' * 200 + '</html>'
+        noise = os.urandom(4096)
+        with tempfile.NamedTemporaryFile(suffix='.css', delete=False) as f:
+            f.write(b'body { color: red; }\n' * 5000)
+        self.addCleanup(os.unlink, f.name)
+
+        entries = [
+            entry_from_bytes('index.html', html.encode('utf-8')),
+            entry_from_bytes('images/noise.bin', noise),
+            entry_from_bytes('résumé.txt', 'Zoë'.encode('utf-8')),
+            # Over ZIP_ASSET_MEMORY_LIMIT: stored and streamed from disk
+            entry_from_file('css/style.css', f.name),
+        ]
+        self.assertEqual([entry.method for entry in entries], [8, 0, 0, 0])
+        files = self._read(entries)
+        self.assertEqual(files['index.html'].decode('utf-8'), html)
+        self.assertEqual(files['images/noise.bin'], noise)
+        self.assertEqual(files['résumé.txt'], 'Zoë'.encode('utf-8'))
+        self.assertEqual(len(files['css/style.css']), 5000 * 21)
+
+    def test_portfolio_download(self):
+        slug = available_template_slugs()[0]
+        files = self._read(portfolio_zip_entries(slug, '<h1>Jane Doe</h1>'))
+        self.assertEqual(files['index.html'], b'<h1>Jane Doe</h1>')
+
+    def test_empty_archive(self):
+        self.assertEqual(self._read([]), {})
+
+
+class TopLevelFieldParserTests(SimpleTestCase):
+    BODY = json.dumps({
+        'name': 'Zoë "ZZ" O\'Brien',
+        'tagline': 'Back\\slash, {braces} and [brackets]',
+        'bio': 'Line one\nLine two \u2014 done',
+        'years': 7,
+        'remote': True,
+        'website': None,
+        'experience': [{'title': 'Engineer', 'skills': ['Python', 'SQL'], 'notes': '}]"'}],
+        'contact': {'email': 'zoe@example.com', 'links': {'github': 'zoe'}},
+    }, indent=2)
+    RESPONSE = '```json\n' + BODY + '\n```'
+
+    def _parse(self, chunk_size):
+        parser = TopLevelFieldParser()
+        completed = []
+        for start in range(0, len(self.RESPONSE), chunk_size):
+            completed.extend(parser.feed(self.RESPONSE[start:start + chunk_size]))
+        return parser, completed
+
+    def test_any_chunking_gives_the_same_fields(self):
+        expected = list(json.loads(self.BODY).items())
+        for chunk_size in list(range(1, 12)) + [64, len(self.RESPONSE)]:
+            parser, completed = self._parse(chunk_size)
+            self.assertEqual(completed, expected, chunk_size)
+            self.assertEqual(parser.fields, dict(expected))
+            self.assertTrue(parser.done)
+
+    def test_fields_arrive_before_the_object_ends(self):
+        parser = TopLevelFieldParser()
+        self.assertEqual(parser.feed('```json\n{"name": "Jane", "bio": "Eng'), [('name', 'Jane')])
+        self.assertEqual(parser.feed('ineer", "skills": ["Py'), [('bio', 'Engineer')])
+        self.assertFalse(parser.done)
+        self.assertEqual(parser.feed('thon"]}\n```'), [('skills', ['Python'])])
+        self.assertTrue(parser.done)
+
+    def test_malformed_object(self):
+        with self.assertRaises(ValueError):
+            TopLevelFieldParser().feed('{"name" "Jane"}')
+        with self.assertRaises(ValueError):
+            TopLevelFieldParser().feed('{name: "Jane"}')
+
+
+class SchemaTests(SimpleTestCase):
+    def test_example_data_is_valid(self):
+        data = example(PORTFOLIO_SCHEMA)
+        self.assertEqual(validate_portfolio_data(data), (data, []))
+
+    def test_malformed_fields_are_coerced_or_reported(self):
+        cleaned, invalid = validate_portfolio_data({
+            'name': '  Jane Doe ',
+            'tagline': 42,
+            'bio': None,
+            'skills': 'Python, SQL, ',
+            'contact': {'email': 'jane@example.com'},
+            'experience': {'role': 'Engineer'},
+            'projects': [{'name': 'Site', 'technologies': 'Django'}, 'not a project'],
+        })
+        self.assertEqual(cleaned['name'], 'Jane Doe')
+        self.assertEqual(cleaned['tagline'], '42')
+        self.assertEqual(cleaned['bio'], '')
+        self.assertEqual(cleaned['skills'], ['Python', 'SQL'])
+        # Missing nested properties are filled in without a retry
+        self.assertEqual(cleaned['contact']['email'], 'jane@example.com')
+        self.assertEqual(cleaned['contact']['github'], '')
+        self.assertEqual(cleaned['experience'], [])
+        self.assertEqual(len(cleaned['projects']), 1)
+        self.assertEqual(cleaned['projects'][0]['technologies'], ['Django'])
+        self.assertEqual(invalid, ['experience', 'projects', 'education'])
+
+    def test_non_object_data(self):
+        cleaned, invalid = validate_portfolio_data(['not', 'an', 'object'])
+        self.assertEqual(invalid, PORTFOLIO_FIELDS)
+        self.assertEqual(cleaned['skills'], [])
+        self.assertEqual(coerce(PORTFOLIO_SCHEMA['properties']['contact'], 'jane@example.com')[1], False)
+
+    def test_decode_response(self):
+        self.assertEqual(decode_response('```json\n{"name": "Jane"}\n```'), {'name': 'Jane'})
+        # Cut off mid-response: the complete fields are kept
+        self.assertEqual(
+            decode_response('```json\n{"name": "Jane", "skills": ["Python"], "bio": "Eng'),
+            {'name': 'Jane', 'skills': ['Python']},
+        )
+        self.assertEqual(decode_response('["Jane"]'), {})
+        self.assertEqual(decode_response('Sorry, I cannot help with that.'), {})
+        self.assertEqual(decode_response('{"name": "Jane", bio: "x"}'), {'name': 'Jane'})
+
+
+class UserProfileSaveDirtyTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='jane')
+
+    def _profile(self):
+        return UserProfile.objects.get(user=self.user)
+
+    def test_nothing_changed_writes_nothing(self):
+        profile = self._profile()
+        profile.gemini_api_key = None
+        with CaptureQueriesContext(connection) as queries:
+            self.assertFalse(profile.save_dirty())
+        self.assertEqual(len(queries), 0)
+
+    def test_only_changed_columns_are_written(self):
+        profile = self._profile()
+        profile.gemini_api_key = 'new-key'
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(profile.save_dirty())
+        self.assertEqual(len(queries), 1)
+        update = queries[0]['sql']
+        self.assertIn('"gemini_api_key"', update)
+        self.assertNotIn('"has_generated_portfolio"', update)
+        self.assertEqual(self._profile().gemini_api_key, 'new-key')
+
+        # Saved values are remembered, so saving again is a no-op
+        with CaptureQueriesContext(connection) as queries:
+            self.assertFalse(profile.save_dirty())
+        self.assertEqual(len(queries), 0)
+
+    def test_user_save_skips_unchanged_profile(self):
+        user = User.objects.select_related('userprofile').get(pk=self.user.pk)
+        with CaptureQueriesContext(connection) as queries:
+            user.save(update_fields=['last_login'])
+        self.assertEqual(len(queries), 1)
+
+        user.userprofile.has_generated_portfolio = True
+        with CaptureQueriesContext(connection) as queries:
+            user.save()
+        self.assertEqual(len(queries), 2)
+        self.assertTrue(self._profile().has_generated_portfolio)
+
+
+@override_settings(PORTFOLIO_STORE_BACKEND='core.portfolio_store.DatabaseStore', PORTFOLIO_STORE_TTL=3600)
+class PortfolioStorePruneTests(TestCase):
+    def setUp(self):
+        PortfolioDataEntry.objects.create(
+            key='old', payload=b'', last_used_at=timezone.now() - timedelta(hours=2),
+        )
+
+    @override_settings(PORTFOLIO_STORE_PRUNE_RATE=0)
+    def test_writes_skip_pruning_when_not_sampled(self):
+        key = portfolio_store.put({'name': 'Jane'})
+        self.assertEqual(sorted(PortfolioDataEntry.objects.values_list('key', flat=True)), sorted([key, 'old']))
+
+    @override_settings(PORTFOLIO_STORE_PRUNE_RATE=1)
+    def test_sampled_write_prunes_expired_entries(self):
+        key = portfolio_store.put({'name': 'Jane'})
+        self.assertEqual(list(PortfolioDataEntry.objects.values_list('key', flat=True)), [key])
+
+
+class JobStatusTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='jane')
+        self.client.force_login(self.user)
+        self.job = PortfolioRequest.objects.create(
+            user=self.user, status=PortfolioRequest.STATUS_DONE, extracted_data={'name': 'Jane Doe'},
+        )
+
+    def test_result_is_stored_once(self):
+        url = reverse('job_status', args=[self.job.pk])
+        with mock.patch.object(views, '_store_portfolio_data', wraps=views._store_portfolio_data) as store:
+            for _ in range(3):
+                response = self.client.get(url)
+                self.assertEqual(response.json()['redirect_url'], reverse('select_template'))
+        self.assertEqual(store.call_count, 1)
+        self.assertEqual(
+            [str(message) for message in get_messages(response.wsgi_request)],
+            ['Resume processed successfully!'],
+        )
+
+    def test_processing_job_returns_its_partial_fields(self):
+        PortfolioRequest.objects.filter(pk=self.job.pk).update(
+            status=PortfolioRequest.STATUS_PROCESSING, partial_data={'name': 'Jane Doe'},
+        )
+        response = self.client.get(reverse('job_status', args=[self.job.pk]))
+        self.assertEqual(response.json(), {'status': 'processing', 'partial_data': {'name': 'Jane Doe'}})
+
+    def test_event_stream_is_opt_in(self):
+        url = reverse('job_events', args=[self.job.pk])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        with override_settings(RESUME_JOB_EVENTS_ENABLED=True):
+            response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+
+@override_settings(VISITOR_TRACKING_SAMPLE_RATE=0)
+class PreviewConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create(username='jane'))
+        self.slug = available_template_slugs()[0]
+        self.url = reverse('preview_portfolio', args=[self.slug])
+        self.data = {'name': 'Jane Doe', 'tagline': 'Engineer', 'skills': ['Python']}
+        self._set_portfolio_data(self.data)
+
+    def _set_portfolio_data(self, data):
+        from django.conf import settings
+
+        session = self.client.session
+        portfolio_store.save_to_session(session, data)
+        session.save()
+        # Signed-cookie sessions live in the cookie itself
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+    def test_matching_validators_get_a_304(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_changed_data_gets_a_200(self):
+        etag = self.client.get(self.url)['ETag']
+        self._set_portfolio_data({**self.data, 'name': 'Someone Else'})
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn(b'Someone Else', response.content)
+
+    def test_changed_template_gets_a_200(self):
+        etag = self.client.get(self.url)['ETag']
+        compiled = views.get_portfolio_template(self.slug)
+        edited = compiled._replace(version=compiled.version + 1)
+        with mock.patch.object(views, 'get_portfolio_template', return_value=edited):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class RunWorkerTests(SimpleTestCase):
+    def test_db_errors_do_not_stop_the_worker(self):
+        from django.db import OperationalError
+
+        job = mock.Mock(pk=1, attempts=1)
+        claims = [OperationalError('database is locked'), job, None]
+        with mock.patch.object(jobs, 'claim_next_job', side_effect=claims), \
+                mock.patch.object(jobs, 'process_job', side_effect=[OperationalError('connection dropped')]) as process, \
+                mock.patch.object(jobs, 'close_old_connections') as close_old, \
+                mock.patch('time.sleep') as sleep:
+            processed = jobs.run_worker(poll_interval=5, once=True)
+        self.assertEqual(processed, 0)
+        process.assert_called_once_with(job)
+        self.assertEqual(close_old.call_count, 3)
+        self.assertEqual(sleep.call_args_list, [mock.call(5), mock.call(5)])
+
+
+class VisitRollupTests(TestCase):
+    def _visit(self, timestamp, ip_address='192.0.2.1'):
+        return Visitor(ip_address=ip_address, path='/', timestamp=timestamp)
+
+    def test_rebuild_leaves_the_open_day_to_record_visits(self):
+        now = timezone.now()
+        closed_day = now - timedelta(days=2)
+        Visitor.objects.bulk_create([self._visit(closed_day), self._visit(closed_day, '192.0.2.2'), self._visit(now)])
+        # Today's rollup was counted as visits arrived, including one still in a buffer
+        record_visits([self._visit(now), self._visit(now)])
+
+        self.assertEqual(rebuild_visit_rollups(timezone.localdate(closed_day), timezone.localdate(now)), 2)
+        daily = dict(DailyVisitStat.objects.filter(path='').values_list('date', 'visits'))
+        self.assertEqual(daily, {timezone.localdate(closed_day): 2, timezone.localdate(now): 2})
+        self.assertEqual(rebuild_visit_rollups(timezone.localdate(now)), 0)
+
+
+class GeminiRequestTests(SimpleTestCase):
+    def _response(self, *texts, finish_reason=1):
+        from google.ai import generativelanguage as glm
+
+        return glm.GenerateContentResponse(candidates=[glm.Candidate(
+            content=glm.Content(parts=[glm.Part(text=text) for text in texts]),
+            finish_reason=finish_reason,
+        )])
+
+    def test_request_asks_for_json_matching_the_schema(self):
+        request = build_request('Extract', response_schema={
+            'type': 'object',
+            'properties': {'skills': {'type': 'array', 'items': {'type': 'string'}}},
+            'required': ['skills'],
+        })
+        self.assertEqual(request.model, 'models/gemini-flash-latest')
+        self.assertEqual(request.contents[0].parts[0].text, 'Extract')
+        config = request.generation_config
+        self.assertEqual(config.response_mime_type, 'application/json')
+        self.assertEqual(config.response_schema.type_.name, 'OBJECT')
+        self.assertEqual(config.response_schema.properties['skills'].items.type_.name, 'STRING')
+        self.assertEqual(list(config.response_schema.required), ['skills'])
+
+    def test_response_text(self):
+        self.assertEqual(response_text(self._response('{"name": ', '"Jane"}')), '{"name": "Jane"}')
+        with self.assertRaises(ValueError):
+            response_text(self._response(finish_reason=3))
+
+    def test_backend_uses_the_pooled_client(self):
+        client = mock.Mock()
+        client.generate_content.return_value = self._response('{"name": "Jane"}')
+        client.stream_generate_content.return_value = iter([
+            self._response('{"name": '), self._response(finish_reason=1), self._response('"Jane"}'),
+        ])
+        with mock.patch('core.llm_backends.get_client', return_value=client) as get_client:
+            backend = GeminiBackend()
+            self.assertEqual(backend.generate('key', 'prompt', ['name']), '{"name": "Jane"}')
+            self.assertEqual(''.join(backend.stream('key', 'prompt', ['name'])), '{"name": "Jane"}')
+        get_client.assert_called_with('key')
+        request = client.generate_content.call_args.args[0]
+        self.assertEqual(list(request.generation_config.response_schema.properties), ['name'])
@@ -0,0 +1,155 @@
+"""
+Resume text cleanup before it goes into the Gemini prompt.
+
+pypdf output carries a lot that costs prompt tokens without telling the
+model anything: the same header/footer on every page, page numbers, words
+split across lines with a hyphen, and long runs of whitespace. The steps
+below remove those while leaving the resume content itself untouched.
+"""
+import re
+import unicodedata
+from collections import Counter, namedtuple
+
+# Header/footer candidates are looked for among this many lines at the top
+# and bottom of each page
+EDGE_LINES = 3
+# With fewer pages, a line at the same place on two of them is as likely to be
+# content (a date range, a skills line) as a running header
+MIN_PAGES_FOR_REPEATS = 3
+
+_PAGE_NUMBER = re.compile(r'^[-–\s]*(page\s*)?\d{1,3}(\s*(of|/)\s*\d{1,3})?[-–\s]*$', re.IGNORECASE)
+# "Page 2", "2 of 3", "2/3" inside a longer header/footer line
+_PAGE_COUNTER = re.compile(r'\b(page\s*\d{1,3}(\s*(of|/)\s*\d{1,3})?|\d{1,3}\s*(of|/)\s*\d{1,3})\b', re.IGNORECASE)
+_BOILERPLATE = [
+    re.compile(r'^(curriculum vitae|r[eé]sum[eé]|cv)$', re.IGNORECASE),
+    re.compile(r'^references?\b.*\b(available|provided)\b.*\brequest\b\.?$', re.IGNORECASE),
+]
+_HYPHENATED = re.compile(r'\b([A-Za-z]{2,})-\n([a-z]{2,})')
+# Line-end hyphens after these are part of a compound word, not a word break
+_COMPOUND_PREFIXES = {
+    'co', 'cross', 'end', 'full', 'high', 'low', 'multi', 'non', 'part', 'real', 'self', 'well',
+}
+_SPACES = re.compile(r'[ \t\f\v]+')
+_INVISIBLE = dict.fromkeys(map(ord, '\u00ad\u200b\u200c\u200d\ufeff'))
+
+
+class CleanupStats(namedtuple('CleanupStats', [
+    'input_chars', 'output_chars', 'repeated_lines', 'page_numbers', 'boilerplate_lines', 'hyphens_joined',
+])):
+    __slots__ = ()
+
+    @property
+    def reduction(self):
+        """Fraction of the input removed"""
+        if not self.input_chars:
+            return 0.0
+        return 1 - self.output_chars / self.input_chars
+
+    def summary(self):
+        return (
+            f"Cleaned resume text {self.input_chars} -> {self.output_chars} chars "
+            f"({self.reduction:.0%} smaller; {self.repeated_lines} header/footer lines, "
+            f"{self.page_numbers} page numbers, {self.boilerplate_lines} boilerplate lines, "
+            f"{self.hyphens_joined} hyphenations)"
+        )
+
+
+def _normalize_line(line):
+    line = unicodedata.normalize('NFKC', line).translate(_INVISIBLE)
+    return _SPACES.sub(' ', line).strip()
+
+
+def _join_hyphenated(match):
+    head, tail = match.groups()
+    if head.lower() in _COMPOUND_PREFIXES:
+        return f'{head}-{tail}'
+    return head + tail
+
+
+def _edge_key_text(line):
+    """Compare lines exactly, except for the numbers in a page counter"""
+    line = line.lower()
+    if _PAGE_NUMBER.match(line):
+        return re.sub(r'\d+', '#', line)
+    return _PAGE_COUNTER.sub(lambda match: re.sub(r'\d+', '#', match.group()), line)
+
+
+def _edge_keys(lines):
+    """
+    Map the index of each of the first and last EDGE_LINES non-blank lines to
+    a key that matches the same header/footer line on other pages
+    """
+    filled = [index for index, line in enumerate(lines) if line]
+    keys = {}
+    # Bottom first so a line that is both keeps its header key
+    for side, indexes in (('bottom', filled[::-1][:EDGE_LINES]), ('top', filled[:EDGE_LINES])):
+        for offset, index in enumerate(indexes):
+            # "Jane Doe - Page 2" and "Jane Doe - Page 3" are the same footer,
+            # "Jan 2020 - Present" and "Jan 2018 - Present" are not
+            keys[index] = (side, offset, _edge_key_text(lines[index]))
+    return keys
+
+
+def _repeated_edge_keys(pages):
+    """Header/footer lines found in the same place on most pages"""
+    if len(pages) < MIN_PAGES_FOR_REPEATS:
+        return set()
+    seen = Counter()
+    for lines in pages:
+        seen.update(set(_edge_keys(lines).values()))
+    threshold = max(2, (len(pages) + 1) // 2)
+    return {key for key, count in seen.items() if count >= threshold}
+
+
+def clean_resume_pages(pages):
+    """
+    Normalize extracted page texts into compact prompt text
+
+    Args:
+        pages: List of page texts, in order
+
+    Returns:
+        tuple: (cleaned text, CleanupStats)
+    """
+    input_chars = sum(len(page) for page in pages)
+    pages = [[_normalize_line(line) for line in page.splitlines()] for page in pages]
+    repeated = _repeated_edge_keys(pages)
+
+    counts = Counter()
+    seen_repeated = set()
+    kept_pages = []
+    for lines in pages:
+        edges = _edge_keys(lines)
+        kept = []
+        for index, line in enumerate(lines):
+            key = edges.get(index)
+            if key and _PAGE_NUMBER.match(line):
+                counts['page_numbers'] += 1
+            elif key in repeated and key in seen_repeated:
+                # The first copy stays: a running header is usually the name
+                counts['repeated'] += 1
+            elif key in repeated:
+                seen_repeated.add(key)
+                kept.append(line)
+            elif any(pattern.match(line) for pattern in _BOILERPLATE):
+                counts['boilerplate'] += 1
+            elif line or (kept and kept[-1]):
+                # Keep at most one blank line in a row
+                kept.append(line)
+        while kept and not kept[-1]:
+            kept.pop()
+        if kept:
+            kept_pages.append('\n'.join(kept))
+
+    text = '\n\n'.join(kept_pages)
+    text, hyphens_joined = _HYPHENATED.subn(_join_hyphenated, text)
+
+    stats = CleanupStats(
+        input_chars=input_chars,
+        output_chars=len(text),
+        repeated_lines=counts['repeated'],
+        page_numbers=counts['page_numbers'],
+        boilerplate_lines=counts['boilerplate'],
+        hyphens_joined=hyphens_joined,
+    )
+    return text, stats
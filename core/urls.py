@@ -4,10 +4,15 @@ from . import views
 urlpatterns = [
     path('', views.home, name='home'),
     path('upload/', views.upload_resume, name='upload_resume'),
+    path('jobs/<int:job_id>/', views.job_progress, name='job_progress'),
+    path('jobs/<int:job_id>/status/', views.job_status, name='job_status'),
+    path('jobs/<int:job_id>/events/', views.job_events, name='job_events'),
     path('select-template/', views.select_template, name='select_template'),
     path('preview/<slug:template_slug>/', views.preview_portfolio, name='preview_portfolio'),
     path('download/<slug:template_slug>/', views.download_portfolio, name='download_portfolio'),
     path('api/login/', views.firebase_login, name='firebase_login'),
+    path('healthz', views.healthz, name='healthz'),
+    path('readyz', views.readyz, name='readyz'),
     path('run-migrations/', views.run_migrations, name='run_migrations'),
     path('logout/', views.logout_view, name='logout'),
     path('clear-api-key/', views.clear_api_key, name='clear_api_key'),
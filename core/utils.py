@@ -1,8 +1,52 @@
-import json
 import os
-from pypdf import PdfReader
-import google.generativeai as genai
 from django.conf import settings
+from django.db import connections
+
+from .extraction_cache import get_cached_portfolio_data, store_portfolio_data
+from .gemini_clients import mask_key
+from .llm_backends import get_llm_backend
+from .pdf_text import extract_pages
+from .quota import (
+    GeminiUnavailable, acquire, backoff_delay, is_quota_error, record_quota_error, record_success,
+    retry_after_hint,
+)
+from .schema import (
+    PORTFOLIO_FIELDS, coerce_field, decode_response, example_json, validate_portfolio_data,
+)
+from .sectioning import SECTION_FIELDS, split_sections
+from .streaming_json import TopLevelFieldParser
+from .text_cleanup import clean_resume_pages
+
+# Bump whenever the prompt or expected JSON shape changes so cached
+# extraction results from the old prompt are no longer served.
+PROMPT_VERSION = '2'
+
+
+def extract_text_with_report(pdf_file, max_pages=None, max_chars=None):
+    """
+    Extract text content from a PDF file within the page/character budget
+    
+    Args:
+        pdf_file: Path to the PDF file OR a file-like object
+        max_pages: Override PDF_MAX_PAGES
+        max_chars: Override PDF_MAX_CHARS
+        
+    Returns:
+        tuple: (extracted text, ExtractionReport with per-page timings and dropped pages)
+    """
+    try:
+        pages, report = extract_pages(pdf_file, max_pages=max_pages, max_chars=max_chars)
+    except Exception as e:
+        raise Exception(f"Error extracting text from PDF: {str(e)}")
+    print(f"DEBUG: {report.summary()}")
+
+    if not settings.RESUME_TEXT_CLEANUP:
+        return "\n".join(pages).strip(), report
+
+    # Headers/footers, page numbers and whitespace only cost prompt tokens
+    text, cleanup_stats = clean_resume_pages(pages)
+    print(f"DEBUG: {cleanup_stats.summary()}")
+    return text, report
 
 
 def extract_text_from_pdf(pdf_file):
@@ -15,27 +59,229 @@ def extract_text_from_pdf(pdf_file):
     Returns:
         str: Extracted text from the PDF
     """
+    text, _ = extract_text_with_report(pdf_file)
+    return text
+
+
+def _stream_response_text(chunks, on_field):
+    """Collect a streamed response, reporting top-level JSON fields as they complete"""
+    parser = TopLevelFieldParser()
+    parts = []
+    for piece in chunks:
+        parts.append(piece)
+        if parser is None:
+            continue
+
+        try:
+            fields = parser.feed(piece)
+        except ValueError as e:
+            # Not the JSON we expected; the full response is still parsed below
+            print(f"DEBUG: Stopped incremental parsing: {e}")
+            parser = None
+            continue
+        for key, value in fields:
+            try:
+                on_field(key, value)
+            except Exception as e:
+                print(f"DEBUG: Error publishing partial field {key}: {e}")
+    return ''.join(parts)
+
+
+def _generate(api_key, prompt, fields=None, on_field=None):
+    """
+    Run one LLM request under the shared rate limiter and return the response text
+
+    The request goes to the configured backend (settings.LLM_BACKEND).
+    Quota and overload errors are retried with jittered backoff (honouring
+    the server's retry-after hint) until the circuit breaker opens, the
+    retries run out, or the next wait would go past GEMINI_RETRY_BUDGET.
+    """
+    import time
+    
+    backend = get_llm_backend()
+    max_retries = max(settings.GEMINI_MAX_RETRIES, 1)
+    deadline = time.monotonic() + settings.GEMINI_RETRY_BUDGET
+    for attempt in range(max_retries):
+        acquire(api_key)
+        try:
+            if on_field:
+                response_text = _stream_response_text(backend.stream(api_key, prompt, fields), on_field)
+            else:
+                response_text = backend.generate(api_key, prompt, fields)
+        except Exception as e:
+            if not is_quota_error(e):
+                raise e
+            retry_after = retry_after_hint(e)
+            breaker_open = record_quota_error(api_key, retry_after)
+            if breaker_open or attempt == max_retries - 1:
+                raise GeminiUnavailable(
+                    f"Gemini quota exceeded. Please try again later. ({str(e)})", retry_after=retry_after
+                )
+            retry_delay = backoff_delay(attempt, retry_after)
+            if retry_delay > deadline - time.monotonic():
+                # Waiting that long would hold a worker past its budget; fail now instead
+                raise GeminiUnavailable(
+                    f"Gemini quota exceeded. Please try again later. ({str(e)})",
+                    retry_after=retry_after or retry_delay,
+                )
+            print(f"Quota exceeded, retrying in {retry_delay:.1f} seconds...")
+            time.sleep(retry_delay)
+            continue
+
+        record_success(api_key)
+        return response_text
+
+
+def _repair_fields(api_key, text, fields):
+    """Ask again for only the fields that were missing or invalid"""
+    prompt = f"""You are a professional career consultant. A structured summary was extracted from the resume below, but these fields were missing or malformed: {', '.join(fields)}.
+
+Resume Text:
+{text}
+
+Extract ONLY those fields. Return ONLY a valid JSON object with this exact structure:
+{example_json(fields)}"""
+
+    response_text = _generate(api_key, prompt, fields)
+    return validate_portfolio_data(decode_response(response_text), fields)
+
+
+SECTION_INSTRUCTIONS = {
+    'profile': (
+        "Extract the name, title/tagline, bio/about me, skills and contact information (email, phone, "
+        "linkedin, github, website). If the bio/about me section is missing, synthesize a professional "
+        "2-3 sentence summary based on the experience and skills listed."
+    ),
+    'experience': (
+        "Extract every position with its title/role, organization, duration, description and "
+        "technologies/skills used."
+    ),
+    'projects': (
+        "Extract every project with its name, duration, description, technologies/skills used and link. "
+        "If project descriptions are brief, enhance them slightly to be more portfolio-friendly "
+        "(but stay truthful to the content)."
+    ),
+    'education': "Extract every degree with its institution, duration and details (GPA, honors, relevant coursework).",
+}
+
+
+def _sections_to_extract(text):
+    """
+    Resume text per section group when sectioned extraction applies, else None
+
+    Long resumes with recognisable sections are extracted with one smaller
+    request per group, run concurrently.
+    """
+    if not settings.RESUME_SECTIONED_EXTRACTION or len(text) < settings.RESUME_SECTIONED_MIN_CHARS:
+        return None
+    sections = split_sections(text)
+    if len(set(sections) - {'profile'}) < 2:
+        # Not enough structure found to be worth splitting
+        return None
+    return sections
+
+
+def _extract_section(api_key, group, section_text):
+    fields = SECTION_FIELDS[group]
+    prompt = f"""You are a professional career consultant. Analyze the following part of a resume and extract structured information.
+
+Resume Text:
+{section_text}
+
+Your task: {SECTION_INSTRUCTIONS[group]}
+
+Return ONLY a valid JSON object with this exact structure:
+{example_json(fields)}"""
+
     try:
-        reader = PdfReader(pdf_file)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text.strip()
-    except Exception as e:
-        raise Exception(f"Error extracting text from PDF: {str(e)}")
+        response_text = _generate(api_key, prompt, fields)
+    finally:
+        # Runs on a pool thread; the rate limiter opened a connection for it
+        connections.close_all()
+    return validate_portfolio_data(decode_response(response_text), fields)
 
 
-def get_portfolio_data(text, api_key=None):
+def _extract_sectioned(api_key, text, sections, on_field=None):
+    """
+    Extract each section group with its own concurrent request and merge the results
+
+    Returns:
+        tuple: (portfolio data, list of fields that were missing or invalid)
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    jobs = {}
+    for group in SECTION_FIELDS:
+        # The profile sees the whole resume so a missing bio can be synthesized
+        # from the experience; groups without a heading get the whole text too
+        group_text = sections.get(group) if group != 'profile' else None
+        jobs[group] = group_text or text
+    print(f"DEBUG: Sectioned extraction of {len(text)} chars: "
+          + ', '.join(f"{group}={len(group_text)}" for group, group_text in jobs.items()))
+
+    portfolio_data = {}
+    invalid_fields = []
+    errors = []
+    with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+        futures = {
+            executor.submit(_extract_section, api_key, group, group_text): group
+            for group, group_text in jobs.items()
+        }
+        for future in as_completed(futures):
+            group = futures[future]
+            try:
+                data, invalid = future.result()
+            except Exception as e:
+                print(f"DEBUG: Section {group} failed: {e}")
+                errors.append(e)
+                data, invalid = validate_portfolio_data({}, SECTION_FIELDS[group])
+            portfolio_data.update(data)
+            invalid_fields.extend(invalid)
+            if on_field:
+                # Published from this thread: the callback may use the database
+                for key, value in data.items():
+                    if key not in invalid:
+                        on_field(key, value)
+
+    if len(errors) == len(jobs):
+        # Nothing to repair from (bad key, quota...): report the actual error
+        raise errors[0]
+
+    # Keep the usual field order
+    portfolio_data = {key: portfolio_data[key] for key in PORTFOLIO_FIELDS}
+    invalid_fields = [key for key in PORTFOLIO_FIELDS if key in invalid_fields]
+    return portfolio_data, invalid_fields
+
+
+def get_portfolio_data(text, api_key=None, use_cache=True, on_field=None):
     """
     Use Google Gemini API to parse resume text and extract structured data
     
+    The response is constrained to PORTFOLIO_SCHEMA; fields that still come
+    back missing or malformed are requested again on their own instead of
+    failing the whole upload.
+    
     Args:
         text: Raw text extracted from resume PDF
         api_key: Optional user-provided Gemini API key
+        use_cache: Serve and store results in the extraction cache
+        on_field: Optional callback(key, value); if given the response is
+            streamed and each top-level field is passed on as soon as it
+            has been generated
         
     Returns:
         dict: Structured portfolio data
     """
+    if use_cache:
+        cached = get_cached_portfolio_data(text, PROMPT_VERSION)
+        if cached is not None:
+            return cached
+
+    def publish_field(key, value):
+        value, valid = coerce_field(key, value)
+        if valid:
+            on_field(key, value)
+
     try:
         # Configure Gemini API
         api_key_to_use = api_key if api_key else settings.GEMINI_API_KEY
@@ -44,13 +290,7 @@ def get_portfolio_data(text, api_key=None):
             raise Exception("No Gemini API key provided. Please provide one in the premium options.")
             
         # Debug print (masked)
-        masked_key = f"{api_key_to_use[:4]}...{api_key_to_use[-4:]}" if len(api_key_to_use) > 8 else "****"
-        print(f"DEBUG: Configuring Gemini with key: {masked_key}")
-        
-        genai.configure(api_key=api_key_to_use)
-        
-        # Create the model
-        model = genai.GenerativeModel('gemini-flash-latest')
+        print(f"DEBUG: Using Gemini with key: {mask_key(api_key_to_use)}")
         
         # Craft the prompt
         prompt = f"""You are a professional career consultant. Analyze the following resume text and extract structured information.
@@ -65,91 +305,50 @@ Your task:
 4. For experience and projects, include: title/role, organization/name, duration, description, and technologies/skills used
 
 Return ONLY a valid JSON object with this exact structure:
-{{
-    "name": "Full Name",
-    "tagline": "Professional Title or Tagline",
-    "bio": "Professional bio/about me section",
-    "contact": {{
-        "email": "email@example.com",
-        "phone": "+1234567890",
-        "linkedin": "linkedin.com/in/username",
-        "github": "github.com/username",
-        "website": "yourwebsite.com"
-    }},
-    "skills": ["skill1", "skill2", "skill3"],
-    "experience": [
-        {{
-            "role": "Job Title",
-            "company": "Company Name",
-            "duration": "Jan 2020 - Present",
-            "description": "Brief description of responsibilities and achievements",
-            "technologies": ["tech1", "tech2"]
-        }}
-    ],
-    "projects": [
-        {{
-            "name": "Project Name",
-            "duration": "2023",
-            "description": "Project description highlighting key features and impact",
-            "technologies": ["tech1", "tech2"],
-            "link": "github.com/project or demo-link.com"
-        }}
-    ],
-    "education": [
-        {{
-            "degree": "Degree Name",
-            "institution": "University Name",
-            "duration": "2015 - 2019",
-            "details": "GPA, honors, relevant coursework"
-        }}
-    ]
-}}
+{example_json()}
 
 Important: Return ONLY the JSON object, no additional text or markdown formatting."""
 
-        # Generate response with retry logic
-        import time
-        max_retries = 3
-        retry_delay = 2
-        
-        for attempt in range(max_retries):
-            try:
-                response = model.generate_content(prompt)
-                break
-            except Exception as e:
-                if "429" in str(e) and attempt < max_retries - 1:
-                    print(f"Quota exceeded, retrying in {retry_delay} seconds...")
-                    time.sleep(retry_delay)
-                    retry_delay *= 2  # Exponential backoff
-                else:
-                    raise e
-        
-        # Extract JSON from response
-        response_text = response.text.strip()
-        
-        # Remove markdown code blocks if present
-        if response_text.startswith('```'):
-            response_text = response_text.split('```')[1]
-            if response_text.startswith('json'):
-                response_text = response_text[4:]
-        
-        # Parse JSON
-        portfolio_data = json.loads(response_text.strip())
-        
-        return portfolio_data
+        sections = _sections_to_extract(text)
+        if sections:
+            portfolio_data, invalid_fields = _extract_sectioned(api_key_to_use, text, sections, on_field)
+        else:
+            response_text = _generate(
+                api_key_to_use, prompt, on_field=publish_field if on_field else None
+            )
+            portfolio_data, invalid_fields = validate_portfolio_data(decode_response(response_text))
+
+        if len(invalid_fields) == len(PORTFOLIO_FIELDS):
+            raise Exception("Gemini returned no usable JSON.")
+
+        if invalid_fields:
+            print(f"DEBUG: Repairing invalid fields: {', '.join(invalid_fields)}")
+            repaired, still_invalid = _repair_fields(api_key_to_use, text, invalid_fields)
+            portfolio_data.update(repaired)
+            if still_invalid:
+                # Left at their empty defaults; the templates handle those
+                print(f"DEBUG: Fields still invalid after repair: {', '.join(still_invalid)}")
+            if on_field:
+                for key in invalid_fields:
+                    on_field(key, portfolio_data[key])
         
-    except json.JSONDecodeError as e:
-        raise Exception(f"Error parsing JSON response from Gemini: {str(e)}\nResponse: {response_text}")
     except Exception as e:
         raise Exception(f"Error getting portfolio data from Gemini: {str(e)}")
 
+    if use_cache:
+        store_portfolio_data(text, PROMPT_VERSION, portfolio_data)
+
+    return portfolio_data
 
-def parse_resume_with_gemini(pdf_path):
+
+def parse_resume_with_gemini(pdf_path, api_key=None, on_field=None):
     """
     Complete pipeline: Extract text from PDF and get structured data from Gemini
     
     Args:
-        pdf_path: Path to the PDF file
+        pdf_path: Path to the PDF file OR a file-like object
+        api_key: Optional user-provided Gemini API key
+        on_field: Optional callback for fields as they stream in (see get_portfolio_data)
         
     Returns:
         dict: Structured portfolio data
@@ -158,9 +357,9 @@ def parse_resume_with_gemini(pdf_path):
     text = extract_text_from_pdf(pdf_path)
     
     if not text:
-        raise Exception("No text could be extracted from the PDF")
+        raise Exception("Could not extract text from PDF. Is it an image scan?")
     
     # Get structured data from Gemini
-    portfolio_data = get_portfolio_data(text)
+    portfolio_data = get_portfolio_data(text, api_key=api_key, on_field=on_field)
     
     return portfolio_data
@@ -1,15 +1,27 @@
-import os
-import zipfile
-from io import BytesIO
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse, FileResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date, quote_etag
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.conf import settings
 from django.contrib import messages
-from django.template import Template, Context
 from django.template.loader import render_to_string
 from .utils import get_portfolio_data, extract_text_from_pdf
 from .forms import ResumeUploadForm
-from .models import PortfolioTemplate, PremiumWaitlist
+from .models import PortfolioTemplate, PremiumWaitlist, PortfolioRequest
+from .jobs import enqueue_resume
+from .rendering import get_portfolio_template, portfolio_data_digest, render_portfolio
+from . import portfolio_store
+from .packaging import portfolio_zip_entries, stream_zip, zip_size
+from .firebase import verify_id_token
+from .warmup import is_ready, start_warmup, warmup_status
+
+# Seconds between checks for new fields while streaming job events
+JOB_EVENTS_POLL_INTERVAL = 0.5
+# Longest one event stream stays open; the browser then reconnects with
+# Last-Event-ID and picks up where it left off
+JOB_EVENTS_STREAM_SECONDS = 25
 
 
 import json
@@ -19,9 +31,9 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.http import JsonResponse, HttpResponse
 from django.core.management import call_command
-from firebase_admin import auth
 import io
 import sys
+import time
 
 def firebase_login(request):
     """Verify Firebase ID token and login user"""
@@ -36,7 +48,7 @@ def firebase_login(request):
             return JsonResponse({'error': 'No ID token provided'}, status=400)
             
         # Verify the token with Firebase Admin SDK
-        decoded_token = auth.verify_id_token(id_token)
+        decoded_token = verify_id_token(id_token)
         uid = decoded_token['uid']
         email = decoded_token.get('email')
         name = decoded_token.get('name', '')
@@ -47,9 +59,9 @@ def firebase_login(request):
             email = f"{uid}@no-email.firebase"
             print(f"DEBUG: No email found in token for UID {uid}, using fallback: {email}")
             
-        # Get or create user
+        # Get or create user (with the profile in the same query)
         try:
-            user = User.objects.get(username=uid)
+            user = User.objects.select_related('userprofile').get(username=uid)
         except User.DoesNotExist:
             # Create new user
             # Use UID as username to ensure uniqueness
@@ -80,7 +92,7 @@ def clear_api_key(request):
     try:
         profile = request.user.userprofile
         profile.gemini_api_key = None
-        profile.save()
+        profile.save_dirty()
         messages.success(request, 'Saved API key cleared successfully.')
     except Exception as e:
         messages.error(request, f'Error clearing API key: {str(e)}')
@@ -117,6 +129,11 @@ def home(request):
     return render(request, 'core/home.html', context)
 
 
+def _store_portfolio_data(request, portfolio_data):
+    """Store extracted data server-side; the session only keeps its key"""
+    portfolio_store.save_to_session(request.session, portfolio_data)
+
+
 @login_required
 def upload_resume(request):
     """Handle PDF upload and extraction (Stateless for Vercel)"""
@@ -137,14 +154,7 @@ def upload_resume(request):
             return redirect('home')
 
         try:
-            # 1. Extract text directly from memory (file stream)
-            text = extract_text_from_pdf(file)
-            
-            if not text:
-                messages.error(request, 'Could not extract text from PDF. Is it an image scan?')
-                return redirect('home')
-            
-            # 2. Determine which API key to use
+            # 1. Determine which API key to use
             user_api_key = request.POST.get('user_api_key', '').strip()
             profile = None
             
@@ -155,7 +165,6 @@ def upload_resume(request):
                     if user_api_key:
                         print(f"DEBUG: Using API key from POST for user {request.user.username}")
                         profile.gemini_api_key = user_api_key
-                        profile.save()
                     # If no key in form, try to use saved key
                     elif profile.gemini_api_key:
                         print(f"DEBUG: Using saved API key from Profile for user {request.user.username}")
@@ -166,27 +175,47 @@ def upload_resume(request):
                     print(f"DEBUG: Error accessing profile: {e}")
                     pass
 
-            # 3. Get structured data from Gemini
             try:
-                extracted_data = get_portfolio_data(text, api_key=user_api_key)
-            except Exception as e:
-                # If there's an error and we're using a user API key, it might be invalid
-                if user_api_key and user_api_key != settings.GEMINI_API_KEY:
-                    messages.error(request, f'API Key Error: {str(e)}. Please update your API key or use the premium feature.')
-                else:
-                    messages.error(request, f'Error processing resume: {str(e)}')
-                return redirect('home')
+                # 2. Hand off to the worker queue if enabled
+                if settings.RESUME_PROCESSING_ASYNC:
+                    if profile:
+                        # The worker reads the API key from the saved profile
+                        profile.save_dirty()
+                    job = enqueue_resume(request.user, file)
+                    return redirect('job_progress', job_id=job.pk)
+
+                # 3. Extract text directly from memory (file stream)
+                text = extract_text_from_pdf(file)
             
-            # 4. Store data in SESSION (Stateless!)
-            request.session['portfolio_data'] = extracted_data
+                if not text:
+                    messages.error(request, 'Could not extract text from PDF. Is it an image scan?')
+                    return redirect('home')
             
-            # Mark that the user has used their free generation
-            if profile:
-                profile.has_generated_portfolio = True
-                profile.save()
+                # 4. Get structured data from Gemini
+                try:
+                    extracted_data = get_portfolio_data(text, api_key=user_api_key)
+                except Exception as e:
+                    # If there's an error and we're using a user API key, it might be invalid
+                    if user_api_key and user_api_key != settings.GEMINI_API_KEY:
+                        messages.error(request, f'API Key Error: {str(e)}. Please update your API key or use the premium feature.')
+                    else:
+                        messages.error(request, f'Error processing resume: {str(e)}')
+                    return redirect('home')
             
-            messages.success(request, 'Resume processed successfully!')
-            return redirect('select_template')
+                # 5. Store data (the session only holds its key)
+                _store_portfolio_data(request, extracted_data)
+            
+                # Mark that the user has used their free generation
+                if profile:
+                    profile.has_generated_portfolio = True
+            
+                messages.success(request, 'Resume processed successfully!')
+                return redirect('select_template')
+            
+            finally:
+                # One write for whatever changed on the profile (API key, free generation used)
+                if profile:
+                    profile.save_dirty()
             
         except Exception as e:
             messages.error(request, f'Unexpected error: {str(e)}')
@@ -197,11 +226,102 @@ def upload_resume(request):
     return render(request, 'core/home.html', {'form': form})
 
 
+@login_required
+def job_progress(request, job_id):
+    """Show a waiting page while a queued resume is processed"""
+    job = get_object_or_404(PortfolioRequest, pk=job_id, user=request.user)
+    return render(request, 'core/processing.html', {
+        'job': job,
+        'job_events_enabled': settings.RESUME_JOB_EVENTS_ENABLED,
+    })
+
+
+def _sse_event(event, data, event_id=None):
+    prefix = f"id: {event_id}\n" if event_id is not None else ''
+    return f"{prefix}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _job_event_stream(job_id, last_event_id=''):
+    """
+    Server-sent events with the job's fields as they arrive, then its final status
+
+    Each stream ends after JOB_EVENTS_STREAM_SECONDS. Field events carry the
+    keys sent so far as their ID, which the browser sends back as
+    Last-Event-ID when it reconnects, so fields aren't sent twice.
+    """
+    finished = (PortfolioRequest.STATUS_DONE, PortfolioRequest.STATUS_FAILED)
+    stream_ends = time.monotonic() + JOB_EVENTS_STREAM_SECONDS
+    sent = {key: None for key in last_event_id.split(',') if key}
+    yield 'retry: 1000\n\n'
+    while True:
+        job = PortfolioRequest.objects.filter(pk=job_id).values('status', 'partial_data', 'created_at').first()
+        if job is None:
+            return
+        for key, value in (job['partial_data'] or {}).items():
+            if key not in sent or (sent[key] is not None and sent[key] != value):
+                sent[key] = value
+                yield _sse_event('field', {'key': key, 'value': value}, event_id=','.join(sent))
+        if job['status'] in finished:
+            yield _sse_event('done', {'status': job['status']})
+            return
+        if (timezone.now() - job['created_at']).total_seconds() > settings.RESUME_JOB_TIMEOUT:
+            yield _sse_event('timeout', {'status': job['status']})
+            return
+        if time.monotonic() > stream_ends:
+            # The browser reconnects after the retry delay
+            return
+        yield _sse_event('status', {'status': job['status']})
+        time.sleep(JOB_EVENTS_POLL_INTERVAL)
+
+
+@login_required
+def job_events(request, job_id):
+    """Stream a queued resume's partial results as server-sent events"""
+    # Each open stream holds a worker, so it's opt-in for async/threaded servers
+    if not settings.RESUME_JOB_EVENTS_ENABLED:
+        raise Http404
+    job = get_object_or_404(PortfolioRequest.objects.only('pk'), pk=job_id, user=request.user)
+    response = StreamingHttpResponse(
+        _job_event_stream(job.pk, request.headers.get('Last-Event-ID', '')),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@login_required
+def job_status(request, job_id):
+    """Lightweight polling endpoint for a queued resume"""
+    job = get_object_or_404(
+        PortfolioRequest.objects.only('status', 'error', 'extracted_data', 'partial_data', 'user_id'),
+        pk=job_id,
+        user=request.user,
+    )
+    payload = {'status': job.status}
+    
+    if job.status == PortfolioRequest.STATUS_DONE:
+        # Only the first poll after the job finished stores the result
+        if request.session.get(portfolio_store.SESSION_KEY) != portfolio_data_digest(job.extracted_data):
+            _store_portfolio_data(request, job.extracted_data)
+            messages.success(request, 'Resume processed successfully!')
+        payload['redirect_url'] = reverse('select_template')
+    elif job.status == PortfolioRequest.STATUS_FAILED:
+        messages.error(request, job.error or 'Error processing resume.')
+        payload['redirect_url'] = reverse('home')
+    else:
+        # Fields the worker has already read, shown while it finishes the rest
+        payload['partial_data'] = job.partial_data or {}
+    
+    return JsonResponse(payload)
+
+
 @login_required
 def select_template(request):
     """Display available templates for selection"""
-    # Check if we have data in session
-    portfolio_data = request.session.get('portfolio_data')
+    # Check if we have data for this session
+    portfolio_data, _ = portfolio_store.load_from_session(request.session)
     if not portfolio_data:
         messages.error(request, 'Please upload a resume first.')
         return redirect('home')
@@ -233,94 +353,78 @@ def select_template(request):
 @login_required
 def preview_portfolio(request, template_slug):
     """Preview the generated portfolio"""
-    # Get data from session
-    context_data = request.session.get('portfolio_data')
+    # Get data for this session; its key is the data's digest
+    context_data, digest = portfolio_store.load_from_session(request.session)
     
     if not context_data:
         messages.error(request, 'Session expired. Please upload resume again.')
         return redirect('home')
     
-    # Load the template file
-    template_path = os.path.join(
-        settings.BASE_DIR,
-        'core',
-        'templates',
-        'portfolios',
-        template_slug,
-        'index.html'
-    )
+    # Load the compiled template
+    portfolio_template = get_portfolio_template(template_slug)
     
-    if not os.path.exists(template_path):
+    if portfolio_template is None:
         return HttpResponse("Template not found", status=404)
     
-    with open(template_path, 'r') as f:
-        template_content = f.read()
+    # The page only changes when the template or the data does, so let the
+    # browser revalidate with ETag / Last-Modified instead of re-downloading
+    etag = quote_etag(f'{template_slug}-{portfolio_template.version}-{digest[:32]}')
+    last_modified = max(
+        portfolio_template.version // 1_000_000_000,
+        request.session.get(portfolio_store.UPDATED_AT_SESSION_KEY, 0),
+    )
     
-    # Render with Django template engine
-    django_template = Template(template_content)
-    rendered_html = django_template.render(Context(context_data))
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(render_portfolio(template_slug, context_data, digest=digest))
     
-    return HttpResponse(rendered_html)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 @login_required
 def download_portfolio(request, template_slug):
     """Generate and download portfolio as ZIP file"""
-    # Get data from session
-    context_data = request.session.get('portfolio_data')
+    # Get data for this session
+    context_data, digest = portfolio_store.load_from_session(request.session)
     
     if not context_data:
         messages.error(request, 'Session expired. Please upload resume again.')
         return redirect('home')
     
-    # Load template
-    template_dir = os.path.join(
-        settings.BASE_DIR,
-        'core',
-        'templates',
-        'portfolios',
-        template_slug
-    )
-    
-    template_path = os.path.join(template_dir, 'index.html')
-    
-    if not os.path.exists(template_path):
-        return HttpResponse("Template not found", status=404)
-    
-    with open(template_path, 'r') as f:
-        template_content = f.read()
-    
     # Render
-    django_template = Template(template_content)
-    rendered_html = django_template.render(Context(context_data))
-    
-    # Create ZIP in memory
-    zip_buffer = BytesIO()
+    rendered_html = render_portfolio(template_slug, context_data, digest=digest)
     
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        # Add rendered HTML
-        zip_file.writestr('index.html', rendered_html)
-        
-        # Add assets
-        for root, dirs, files in os.walk(template_dir):
-            for file in files:
-                if file != 'index.html':
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, template_dir)
-                    zip_file.write(file_path, arcname)
+    if rendered_html is None:
+        return HttpResponse("Template not found", status=404)
     
-    # Response
-    zip_buffer.seek(0)
-    response = FileResponse(
-        zip_buffer,
+    # Stream the ZIP as it is built; template assets are pre-compressed once
+    entries = portfolio_zip_entries(template_slug, rendered_html)
+    response = StreamingHttpResponse(stream_zip(entries), content_type='application/zip')
+    response['Content-Length'] = zip_size(entries)
+    response['Content-Disposition'] = content_disposition_header(
         as_attachment=True,
         filename=f'portfolio_{template_slug}.zip'
     )
-    response['Content-Type'] = 'application/zip'
     
     return response
 
 
+def healthz(request):
+    """Liveness probe: the process is up and serving requests"""
+    return JsonResponse({'status': 'ok', 'warmup': warmup_status()['status']})
+
+
+def readyz(request):
+    """Readiness probe: 503 until warm-up has finished, with its step timings"""
+    # Processes that weren't started through wsgi.py (e.g. tests) warm up on the first probe
+    start_warmup()
+    ready = is_ready()
+    return JsonResponse({'ready': ready, 'warmup': warmup_status()}, status=200 if ready else 503)
+
+
 def run_migrations(request):
     """Helper to run migrations on Vercel"""
     # Only allow superusers or if DEBUG is True (or just open for this fix)
@@ -0,0 +1,194 @@
+"""
+Pre-aggregated visitor statistics.
+
+DailyVisitStat and HourlyVisitStat are kept up to date incrementally each
+time the tracking middleware flushes a batch of visits, so the dashboard
+never has to scan the raw Visitor table. Each daily row also carries a
+HyperLogLog sketch of the visitor IPs, so unique visitor counts stay
+incremental and sketches for any range of days can be merged.
+rebuild_visit_rollups recomputes closed days from raw visits (used by
+`manage.py rollup_visitors` for backfills); the current day is only ever
+updated incrementally, since a rebuild running alongside record_visits
+would lose or double count the batches written in between.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .hyperloglog import HyperLogLog
+from .models import DailyVisitStat, HourlyVisitStat, Visitor
+
+ALL_PATHS = DailyVisitStat.ALL_PATHS
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def last_closed_day():
+    """
+    The most recent day with no visits left to record
+
+    The tracking middleware buffers visits for up to
+    VISITOR_TRACKING_FLUSH_INTERVAL seconds, so a day is closed a couple of
+    flush intervals after it ends.
+    """
+    settled = timezone.now() - timedelta(seconds=2 * settings.VISITOR_TRACKING_FLUSH_INTERVAL)
+    return timezone.localdate(settled) - timedelta(days=1)
+
+
+def _increment(model, lookup, amount):
+    """Add `amount` visits to the row matching `lookup`, creating it if needed"""
+    if model.objects.filter(**lookup).update(visits=F('visits') + amount):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(visits=amount, **lookup)
+    except IntegrityError:
+        # Created concurrently by another process
+        model.objects.filter(**lookup).update(visits=F('visits') + amount)
+
+
+def _load_sketch(stat):
+    if stat.unique_sketch:
+        return HyperLogLog.from_bytes(stat.unique_sketch)
+    return HyperLogLog()
+
+
+def _add_to_daily_stat(day, path, amount, ip_addresses):
+    """Add visits and visitor IPs to a daily row under a row lock"""
+    with transaction.atomic():
+        # get_or_create falls back to a get if another process creates the row first
+        stat, _ = DailyVisitStat.objects.select_for_update().get_or_create(date=day, path=path)
+
+        sketch = _load_sketch(stat)
+        sketch.update(ip_addresses)
+        stat.visits += amount
+        stat.unique_visitors = sketch.count()
+        stat.unique_sketch = sketch.to_bytes()
+        stat.save(update_fields=['visits', 'unique_visitors', 'unique_sketch'])
+
+
+def record_visits(visits):
+    """Fold a batch of Visitor objects into the rollup tables"""
+    daily = Counter()
+    daily_ips = defaultdict(set)
+    hourly = Counter()
+    for visit in visits:
+        local = timezone.localtime(visit.timestamp)
+        day = local.date()
+        hour = local.replace(minute=0, second=0, microsecond=0)
+        for path in (visit.path, ALL_PATHS):
+            daily[day, path] += 1
+            daily_ips[day, path].add(visit.ip_address)
+            hourly[hour, path] += 1
+
+    for (day, path), amount in daily.items():
+        _add_to_daily_stat(day, path, amount, daily_ips[day, path])
+    for (hour, path), amount in hourly.items():
+        _increment(HourlyVisitStat, {'hour': hour, 'path': path}, amount)
+
+
+def rebuild_visit_rollups(start_date, end_date=None):
+    """
+    Recompute the rollups for whole days from the raw Visitor table
+
+    Args:
+        start_date: First day to rebuild
+        end_date: Last day to rebuild (inclusive), defaults to and is
+            capped at last_closed_day()
+
+    Returns:
+        int: Number of raw visits aggregated
+    """
+    closed = last_closed_day()
+    end_date = min(end_date or closed, closed)
+    if start_date > end_date:
+        return 0
+    start = day_start(start_date)
+    end = day_start(end_date + timedelta(days=1))
+    visits = Visitor.objects.filter(timestamp__gte=start, timestamp__lt=end)
+
+    daily = Counter()
+    sketches = defaultdict(HyperLogLog)
+    rows = visits.values_list('timestamp', 'path', 'ip_address').iterator(chunk_size=2000)
+    for timestamp, path, ip_address in rows:
+        day = timezone.localtime(timestamp).date()
+        for key in ((day, path), (day, ALL_PATHS)):
+            daily[key] += 1
+            sketches[key].add(ip_address)
+
+    daily_rows = [
+        DailyVisitStat(
+            date=day,
+            path=path,
+            visits=amount,
+            unique_visitors=sketches[day, path].count(),
+            unique_sketch=sketches[day, path].to_bytes(),
+        )
+        for (day, path), amount in daily.items()
+    ]
+
+    by_hour = visits.annotate(bucket=TruncHour('timestamp'))
+    hourly_rows = [
+        HourlyVisitStat(hour=row['bucket'], path=row['path'], visits=row['visits'])
+        for row in by_hour.values('bucket', 'path').annotate(visits=Count('id'))
+    ] + [
+        HourlyVisitStat(hour=row['bucket'], path=ALL_PATHS, visits=row['visits'])
+        for row in by_hour.values('bucket').annotate(visits=Count('id'))
+    ]
+
+    with transaction.atomic():
+        DailyVisitStat.objects.filter(date__gte=start_date, date__lte=end_date).delete()
+        HourlyVisitStat.objects.filter(hour__gte=start, hour__lt=end).delete()
+        DailyVisitStat.objects.bulk_create(daily_rows, batch_size=500)
+        HourlyVisitStat.objects.bulk_create(hourly_rows, batch_size=500)
+
+    return sum(amount for (day, path), amount in daily.items() if path == ALL_PATHS)
+
+
+def total_visits():
+    """All-time page views"""
+    return DailyVisitStat.objects.filter(path=ALL_PATHS).aggregate(total=Sum('visits'))['total'] or 0
+
+
+def unique_visitors(since=None, until=None, path=ALL_PATHS):
+    """
+    Estimated distinct visitor IPs over a range of days
+
+    Merges the daily HyperLogLog sketches, so the cost depends on the
+    number of days, not the number of visits.
+
+    Args:
+        since: First day to include (default: all time)
+        until: Last day to include (default: today)
+        path: Restrict to one path (default: the whole site)
+    """
+    stats = DailyVisitStat.objects.filter(path=path, unique_sketch__isnull=False)
+    if since is not None:
+        stats = stats.filter(date__gte=since)
+    if until is not None:
+        stats = stats.filter(date__lte=until)
+    sketches = [HyperLogLog.from_bytes(sketch) for sketch in stats.values_list('unique_sketch', flat=True)]
+    return HyperLogLog.union(sketches).count()
+
+
+def visits_since(since):
+    """Page views from the hourly rollups since a point in time"""
+    rows = HourlyVisitStat.objects.filter(path=ALL_PATHS, hour__gte=since)
+    return rows.aggregate(total=Sum('visits'))['total'] or 0
+
+
+def top_paths(limit=10):
+    """Most visited paths, as dicts with `path` and `count`"""
+    return (
+        DailyVisitStat.objects.exclude(path=ALL_PATHS)
+        .values('path')
+        .annotate(count=Sum('visits'))
+        .order_by('-count')[:limit]
+    )
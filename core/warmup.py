@@ -0,0 +1,166 @@
+"""
+Start-up warm-up.
+
+The first upload after a cold start used to pay for importing pypdf and
+the Gemini SDK, creating the Gemini client, compiling templates and
+connecting to the database all at once. portfolio_builder.wsgi arranges
+for start_warmup() to run once the first response has been sent - warming
+up any earlier competes with that request for the GIL, the import lock and
+the database, and roughly doubled a cold start's first page load. It runs
+in a background thread when WARMUP_IN_BACKGROUND is set, so the process
+keeps answering health checks meanwhile.
+
+Each step is timed; warmup_status() reports progress for /readyz, which
+only answers 200 once warm-up has finished and the database was reachable.
+"""
+import importlib
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import connection
+
+STATUS_COLD = 'cold'
+STATUS_RUNNING = 'running'
+STATUS_READY = 'ready'
+STATUS_FAILED = 'failed'
+
+# Steps that must succeed for the process to take traffic
+REQUIRED_STEPS = ['database']
+
+_lock = threading.Lock()
+_state = {'status': STATUS_COLD, 'pid': None, 'started_at': None, 'seconds': None, 'steps': {}}
+
+
+def _warm_database(in_background):
+    connection.ensure_connection()
+    if in_background:
+        # Connections belong to the thread that opened them; request threads open their own
+        connection.close()
+
+
+def _warm_imports(in_background):
+    for module in settings.WARMUP_IMPORTS:
+        importlib.import_module(module)
+
+
+def _warm_templates(in_background):
+    from .packaging import get_asset_entries
+    from .rendering import warm_portfolio_templates
+
+    for slug in warm_portfolio_templates():
+        get_asset_entries(slug)
+
+
+def _warm_llm(in_background):
+    from .gemini_clients import get_client
+    from .llm_backends import GeminiBackend, get_llm_backend
+
+    backend = get_llm_backend()
+    if isinstance(backend, GeminiBackend) and settings.GEMINI_API_KEY:
+        get_client(settings.GEMINI_API_KEY)
+
+
+def _warm_firebase(in_background):
+    from .firebase import ensure_firebase_app
+
+    ensure_firebase_app()
+
+
+STEPS = [
+    ('database', _warm_database),
+    ('imports', _warm_imports),
+    ('templates', _warm_templates),
+    ('llm', _warm_llm),
+    ('firebase', _warm_firebase),
+]
+
+
+def run_warmup(in_background=False):
+    """
+    Run every warm-up step, recording how long each took
+
+    A failing step is recorded and the rest still run.
+
+    Returns:
+        dict: The final warmup_status()
+    """
+    started = time.perf_counter()
+    for name, step in STEPS:
+        step_started = time.perf_counter()
+        error = None
+        try:
+            step(in_background)
+        except Exception as e:
+            error = str(e)
+            print(f"DEBUG: Warm-up step {name} failed: {e}")
+        with _lock:
+            _state['steps'][name] = {
+                'ok': error is None,
+                'ms': round((time.perf_counter() - step_started) * 1000, 1),
+                'error': error,
+            }
+
+    with _lock:
+        failed = [name for name in REQUIRED_STEPS if not _state['steps'].get(name, {}).get('ok')]
+        _state['status'] = STATUS_FAILED if failed else STATUS_READY
+        _state['seconds'] = round(time.perf_counter() - started, 3)
+    print(f"DEBUG: Warm-up {_state['status']} in {_state['seconds']}s")
+    return warmup_status()
+
+
+def start_warmup(in_background=None):
+    """
+    Start warm-up in this process unless it already ran (or is running)
+
+    Args:
+        in_background: Run in a daemon thread (default: WARMUP_IN_BACKGROUND)
+
+    Returns:
+        bool: True if warm-up was started by this call
+    """
+    if not settings.WARMUP_ENABLED:
+        return False
+    if in_background is None:
+        in_background = settings.WARMUP_IN_BACKGROUND
+
+    with _lock:
+        # A worker forked mid-warm-up inherits the parent's state but not its thread
+        forked_while_running = _state['status'] == STATUS_RUNNING and _state['pid'] != os.getpid()
+        if _state['status'] != STATUS_COLD and not forked_while_running:
+            return False
+        _state.update(status=STATUS_RUNNING, pid=os.getpid(), started_at=time.time(), seconds=None, steps={})
+
+    if in_background:
+        threading.Thread(target=run_warmup, args=(True,), name='warmup', daemon=True).start()
+    else:
+        run_warmup()
+    return True
+
+
+def _start_after_response(sender, **kwargs):
+    request_finished.disconnect(dispatch_uid='core.warmup')
+    start_warmup()
+
+
+def start_warmup_after_first_response():
+    """Start warm-up once this process has sent its first response"""
+    if settings.WARMUP_ENABLED:
+        request_finished.connect(_start_after_response, dispatch_uid='core.warmup')
+
+
+def warmup_status():
+    with _lock:
+        status = dict(_state, steps={name: dict(step) for name, step in _state['steps'].items()})
+    if status['pid'] is not None and status['pid'] != os.getpid() and status['status'] == STATUS_RUNNING:
+        # Forked while the parent was still warming up
+        status['status'] = STATUS_COLD
+    del status['pid']
+    return status
+
+
+def is_ready():
+    """Whether this process has finished warming up (always True with warm-up disabled)"""
+    return not settings.WARMUP_ENABLED or warmup_status()['status'] == STATUS_READY
@@ -1,3 +1,139 @@
-from django.test import TestCase
+import base64
+import json
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Visitor
+
+from . import views
+
+
+# Keep the test client's own requests out of the Visitor table
+@override_settings(VISITOR_TRACKING_SAMPLE_RATE=0)
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create(username='staff', is_staff=True)
+        self.client.force_login(self.staff)
+        now = timezone.now()
+        # Five visits share one timestamp, so only the id orders them
+        self.tied_at = now - timedelta(hours=1)
+        Visitor.objects.bulk_create(
+            [Visitor(ip_address='192.0.2.1', path=f'/tied/{i}', timestamp=self.tied_at) for i in range(5)]
+            + [
+                Visitor(ip_address='192.0.2.2', path='/newest', timestamp=now),
+                Visitor(ip_address='192.0.2.3', path='/oldest', timestamp=now - timedelta(days=1)),
+            ]
+        )
+
+    def _get(self, name, **params):
+        response = self.client.get(reverse(f'dashboard:{name}'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def _paths(self, page):
+        return [row['path'] for row in page['results']]
+
+    def _walk(self, **params):
+        paths, cursor = [], ''
+        while True:
+            page = self._get('visits_api', cursor=cursor, **params)
+            paths += self._paths(page)
+            cursor = page['next_cursor']
+            if cursor is None:
+                return paths
+
+    def test_equal_timestamps_are_paged_without_gaps_or_repeats(self):
+        tied = list(
+            Visitor.objects.filter(timestamp=self.tied_at).order_by('-pk').values_list('path', flat=True)
+        )
+        for limit in (1, 2, 3):
+            self.assertEqual(self._walk(limit=limit), ['/newest'] + tied + ['/oldest'])
+
+    def test_last_page_has_no_cursor(self):
+        page = self._get('visits_api', limit=7)
+        self.assertEqual(len(page['results']), 7)
+        self.assertIsNone(page['next_cursor'])
+
+        page = self._get('visits_api', limit=6)
+        self.assertIsNotNone(page['next_cursor'])
+        page = self._get('visits_api', limit=6, cursor=page['next_cursor'])
+        self.assertEqual(self._paths(page), ['/oldest'])
+        self.assertIsNone(page['next_cursor'])
+
+    def test_bad_cursors_start_from_the_first_page(self):
+        first_page = self._paths(self._get('visits_api', limit=3))
+
+        def encode(value):
+            return base64.urlsafe_b64encode(json.dumps(value).encode('utf-8')).decode('ascii')
+
+        for cursor in [
+            'not a cursor',
+            '!!!!',
+            'é',
+            base64.urlsafe_b64encode(b'\xff\xfe').decode('ascii'),
+            encode({'timestamp': 1}),
+            encode([1, 2]),
+            encode(['yesterday', 5]),
+            encode(['2024-13-45T00:00:00', 5]),
+            encode([timezone.now().isoformat(), '5']),
+            encode([timezone.now().isoformat(), 5, 6]),
+        ]:
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self._paths(self._get('visits_api', limit=3, cursor=cursor)), first_page)
+
+    def test_cursor_for_a_deleted_row_still_pages_by_position(self):
+        cursor = views._encode_cursor(self.tied_at, 10 ** 9)
+        page = self._get('visits_api', cursor=cursor)
+        self.assertEqual(len(page['results']), 6)
+        self.assertNotIn('/newest', self._paths(page))
+
+    def test_limit_is_clamped(self):
+        for limit, expected in [('abc', 7), ('', 7), ('0', 1), ('-5', 1), ('2', 2), ('1000', 7)]:
+            with self.subTest(limit=limit):
+                self.assertEqual(len(self._get('visits_api', limit=limit)['results']), expected)
+
+        Visitor.objects.bulk_create(
+            [Visitor(ip_address='192.0.2.4', path='/bulk', timestamp=self.tied_at) for _ in range(views.MAX_PAGE_SIZE)]
+        )
+        self.assertEqual(len(self._get('visits_api', limit='1000')['results']), views.MAX_PAGE_SIZE)
+
+    def test_search(self):
+        self.assertEqual(self._walk(q=' newest '), ['/newest'])
+        self.assertEqual(self._walk(q='192.0.2.3'), ['/oldest'])
+
+        User.objects.create(username='jane', email='jane@example.com')
+        User.objects.create(username='john', email='JOHN@example.org')
+        page = self._get('users_api', q='example.ORG')
+        self.assertEqual([row['username'] for row in page['results']], ['john'])
+        page = self._get('users_api', q='ja')
+        self.assertEqual([row['email'] for row in page['results']], ['jane@example.com'])
+
+    def test_users_with_equal_join_dates_are_paged_without_gaps(self):
+        joined = timezone.now() - timedelta(days=3)
+        User.objects.bulk_create([User(username=f'user{i:02}', date_joined=joined) for i in range(4)])
+        usernames, cursor = [], ''
+        while cursor is not None:
+            page = self._get('users_api', q='user', limit=3, cursor=cursor)
+            usernames += [row['username'] for row in page['results']]
+            cursor = page['next_cursor']
+        self.assertEqual(usernames, ['user03', 'user02', 'user01', 'user00'])
+
+    def test_staff_only(self):
+        urls = [reverse(f'dashboard:{name}') for name in ('home', 'users_api', 'waitlist_api', 'visits_api')]
+        self.client.logout()
+        for url in urls:
+            with self.subTest(url=url, user='anonymous'):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 302)
+                self.assertIn(reverse('admin:login'), response['Location'])
+
+        self.client.force_login(User.objects.create(username='jane'))
+        for url in urls:
+            with self.subTest(url=url, user='jane'):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 302)
+                self.assertIn(reverse('admin:login'), response['Location'])
@@ -5,4 +5,7 @@ app_name = 'dashboard'
 
 urlpatterns = [
     path('', views.dashboard_home, name='home'),
+    path('api/users/', views.users_api, name='users_api'),
+    path('api/waitlist/', views.waitlist_api, name='waitlist_api'),
+    path('api/visits/', views.visits_api, name='visits_api'),
 ]
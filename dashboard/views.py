@@ -1,45 +1,161 @@
+import base64
+import json
+
 from django.shortcuts import render
 from django.contrib.auth.models import User
 from core.models import Visitor, UserProfile, PremiumWaitlist
-from django.db.models import Count
-from django.db.models.functions import TruncDay
+from core import visitor_stats
 from django.contrib.admin.views.decorators import staff_member_required
+from django.db.models import Q
+from django.http import JsonResponse
 from django.utils import timezone
+from django.utils.dateformat import format as format_date
+from django.utils.dateparse import parse_datetime
 from datetime import timedelta
 
+PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+
 @staff_member_required
 def dashboard_home(request):
     # User stats
     total_users = User.objects.count()
     users_with_portfolios = UserProfile.objects.filter(has_generated_portfolio=True).count()
-    
-    # Visitor stats
-    total_visits = Visitor.objects.count()
-    unique_visitors = Visitor.objects.values('ip_address').distinct().count()
-    
-    # Recent visits
-    recent_visits = Visitor.objects.order_by('-timestamp')[:20]
-    
+
+    # Visitor stats (from the rollup tables, never the raw Visitor table)
+    total_visits = visitor_stats.total_visits()
+    unique_visitors = visitor_stats.unique_visitors()
+    unique_visitors_30d = visitor_stats.unique_visitors(since=timezone.localdate() - timedelta(days=29))
+    visits_last_24h = visitor_stats.visits_since(timezone.now() - timedelta(hours=24))
+
     # Visits by path
-    path_stats = Visitor.objects.values('path').annotate(count=Count('id')).order_by('-count')[:10]
-    
-    # Registered users
-    registered_users = User.objects.all().order_by('-date_joined')
-    
+    path_stats = visitor_stats.top_paths(10)
+
     # Premium Waitlist
-    waitlist_users = PremiumWaitlist.objects.all().order_by('-registered_at')
-    total_premium_waitlist = waitlist_users.count()
+    total_premium_waitlist = PremiumWaitlist.objects.count()
 
+    # Registered users, waitlist and recent visits are loaded page by page
+    # from the JSON endpoints below, so this page stays the same size
     context = {
         'total_users': total_users,
         'users_with_portfolios': users_with_portfolios,
         'total_visits': total_visits,
         'unique_visitors': unique_visitors,
-        'recent_visits': recent_visits,
+        'unique_visitors_30d': unique_visitors_30d,
+        'visits_last_24h': visits_last_24h,
         'path_stats': path_stats,
-        'registered_users': registered_users,
-        'waitlist_users': waitlist_users,
         'total_premium_waitlist': total_premium_waitlist,
     }
-    
+
     return render(request, 'dashboard/home.html', context)
+
+
+def _encode_cursor(timestamp, pk):
+    raw = json.dumps([timestamp.isoformat(), pk]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def _decode_cursor(cursor):
+    try:
+        timestamp, pk = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        timestamp = parse_datetime(timestamp)
+    except (ValueError, TypeError):
+        return None
+    if timestamp is None or not isinstance(pk, int):
+        return None
+    return timestamp, pk
+
+
+def _keyset_page(request, queryset, timestamp_field, search_fields):
+    """
+    Return one page of `queryset`, newest first, and the cursor for the next one
+
+    Pages are addressed by the (timestamp, id) of the last row seen rather
+    than an OFFSET, so every page costs the same however deep it is.
+    """
+    try:
+        limit = min(max(int(request.GET.get('limit', PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        limit = PAGE_SIZE
+
+    search = request.GET.get('q', '').strip()
+    if search:
+        query = Q()
+        for field in search_fields:
+            query |= Q(**{f'{field}__icontains': search})
+        queryset = queryset.filter(query)
+
+    cursor = _decode_cursor(request.GET.get('cursor', ''))
+    if cursor:
+        timestamp, pk = cursor
+        queryset = queryset.filter(
+            Q(**{f'{timestamp_field}__lt': timestamp}) |
+            Q(**{timestamp_field: timestamp, 'pk__lt': pk})
+        )
+
+    rows = list(queryset.order_by(f'-{timestamp_field}', '-pk')[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = _encode_cursor(last[timestamp_field], last['pk'])
+    return rows, next_cursor
+
+
+@staff_member_required
+def users_api(request):
+    """Registered users, newest first"""
+    queryset = User.objects.values(
+        'pk', 'username', 'email', 'date_joined', 'userprofile__has_generated_portfolio'
+    )
+    rows, next_cursor = _keyset_page(request, queryset, 'date_joined', ['username', 'email', 'first_name'])
+    return JsonResponse({
+        'results': [
+            {
+                'username': row['username'],
+                'email': row['email'],
+                'joined': format_date(timezone.localtime(row['date_joined']), 'M d, Y'),
+                'has_generated_portfolio': bool(row['userprofile__has_generated_portfolio']),
+            }
+            for row in rows
+        ],
+        'next_cursor': next_cursor,
+    })
+
+
+@staff_member_required
+def waitlist_api(request):
+    """Premium waitlist registrations, newest first"""
+    queryset = PremiumWaitlist.objects.values('pk', 'full_name', 'email', 'registered_at')
+    rows, next_cursor = _keyset_page(request, queryset, 'registered_at', ['full_name', 'email'])
+    return JsonResponse({
+        'results': [
+            {
+                'full_name': row['full_name'],
+                'email': row['email'],
+                'registered': format_date(timezone.localtime(row['registered_at']), 'M d, Y'),
+            }
+            for row in rows
+        ],
+        'next_cursor': next_cursor,
+    })
+
+
+@staff_member_required
+def visits_api(request):
+    """Recent page views, newest first"""
+    queryset = Visitor.objects.values('pk', 'ip_address', 'path', 'timestamp', 'session_key')
+    rows, next_cursor = _keyset_page(request, queryset, 'timestamp', ['ip_address', 'path'])
+    return JsonResponse({
+        'results': [
+            {
+                'ip_address': row['ip_address'],
+                'path': row['path'],
+                'timestamp': format_date(timezone.localtime(row['timestamp']), 'M d, H:i'),
+                'has_session': bool(row['session_key']),
+            }
+            for row in rows
+        ],
+        'next_cursor': next_cursor,
+    })
@@ -98,37 +98,11 @@ TEMPLATES = [
 ]
 
 # Firebase Configuration
-import firebase_admin
-
-# Path to service account key file
+# The Admin SDK is initialized on first use (core.firebase), not at startup.
+# Credentials come from this file, or the FIREBASE_CREDENTIALS_JSON env var
 FIREBASE_CREDENTIALS_PATH = config.get('FIREBASE_CREDENTIALS_PATH', 'firebase-adminsdk.json')
-
-# Initialize Firebase Admin SDK
-try:
-    import firebase_admin
-    from firebase_admin import credentials
-
-    cred_path = FIREBASE_CREDENTIALS_PATH
-    
-    if os.path.exists(cred_path):
-        cred = credentials.Certificate(cred_path)
-    else:
-        # Fallback for Vercel: Read from Environment Variable
-        import json
-        json_config = os.environ.get('FIREBASE_CREDENTIALS_JSON')
-        if json_config:
-            cred_dict = json.loads(json_config)
-            cred = credentials.Certificate(cred_dict)
-        else:
-            cred = None
-            print("Warning: Firebase credentials not found (File or Env Var)")
-
-    if cred and not firebase_admin._apps:
-        firebase_admin.initialize_app(cred)
-except ImportError:
-    print("Firebase Admin SDK not installed.")
-except Exception as e:
-    print(f"Error initializing Firebase: {e}")
+# Verified ID tokens remembered (until they expire) so repeat logins skip verification
+FIREBASE_TOKEN_CACHE_SIZE = int(config.get('FIREBASE_TOKEN_CACHE_SIZE', os.environ.get('FIREBASE_TOKEN_CACHE_SIZE', '1024')))
 
 # Firebase Client Config (for frontend)
 # Firebase Client Config (for frontend)
@@ -237,13 +211,120 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache - holds rendered portfolio previews (per process)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'portfolio-builder',
+        'OPTIONS': {
+            'MAX_ENTRIES': 500,
+        },
+    }
+}
+PORTFOLIO_RENDER_CACHE_TTL = int(config.get('PORTFOLIO_RENDER_CACHE_TTL', os.environ.get('PORTFOLIO_RENDER_CACHE_TTL', '3600')))
+# Template assets up to this size are kept compressed in memory for ZIP downloads;
+# larger ones are streamed from disk uncompressed
+ZIP_ASSET_MEMORY_LIMIT = int(config.get('ZIP_ASSET_MEMORY_LIMIT', os.environ.get('ZIP_ASSET_MEMORY_LIMIT', str(1024 * 1024))))
+
+# Visitor tracking - page views are buffered in memory and written in batches
+VISITOR_TRACKING_SAMPLE_RATE = float(config.get('VISITOR_TRACKING_SAMPLE_RATE', os.environ.get('VISITOR_TRACKING_SAMPLE_RATE', '1.0')))
+visitor_exclude_str = config.get('VISITOR_TRACKING_EXCLUDE_PATHS', os.environ.get('VISITOR_TRACKING_EXCLUDE_PATHS', '/static/,/admin/,/favicon.ico,/healthz,/readyz'))
+VISITOR_TRACKING_EXCLUDE_PATHS = [path.strip() for path in visitor_exclude_str.split(',') if path.strip()]
+VISITOR_TRACKING_BUFFER_SIZE = int(config.get('VISITOR_TRACKING_BUFFER_SIZE', os.environ.get('VISITOR_TRACKING_BUFFER_SIZE', '10000')))
+VISITOR_TRACKING_FLUSH_SIZE = int(config.get('VISITOR_TRACKING_FLUSH_SIZE', os.environ.get('VISITOR_TRACKING_FLUSH_SIZE', '100')))
+VISITOR_TRACKING_FLUSH_INTERVAL = float(config.get('VISITOR_TRACKING_FLUSH_INTERVAL', os.environ.get('VISITOR_TRACKING_FLUSH_INTERVAL', '5')))  # seconds
+# Raw visits older than this are rolled up, archived and deleted by `manage.py prune_visitors`
+VISITOR_RETENTION_DAYS = int(config.get('VISITOR_RETENTION_DAYS', os.environ.get('VISITOR_RETENTION_DAYS', '90')))
+
 # Session configuration - Use Signed Cookies for Vercel (No DB required)
 SESSION_ENGINE = 'django.contrib.sessions.backends.signed_cookies'
 SESSION_COOKIE_AGE = 86400  # 24 hours
 
+# Extracted portfolio data is kept server-side; the session only holds its key.
+# PORTFOLIO_STORE_BACKEND is core.portfolio_store.DatabaseStore (shared by all
+# instances) or core.portfolio_store.FileStore (files under PORTFOLIO_STORE_DIR).
+# Each process also keeps the last PORTFOLIO_STORE_LOCAL_CACHE_SIZE entries decoded.
+PORTFOLIO_STORE_BACKEND = config.get('PORTFOLIO_STORE_BACKEND', os.environ.get('PORTFOLIO_STORE_BACKEND', 'core.portfolio_store.DatabaseStore'))
+PORTFOLIO_STORE_DIR = config.get('PORTFOLIO_STORE_DIR', os.environ.get('PORTFOLIO_STORE_DIR', '')) or os.path.join(BASE_DIR, 'portfolio_data')
+PORTFOLIO_STORE_LOCAL_CACHE_SIZE = int(config.get('PORTFOLIO_STORE_LOCAL_CACHE_SIZE', os.environ.get('PORTFOLIO_STORE_LOCAL_CACHE_SIZE', '256')))
+PORTFOLIO_STORE_TTL = int(config.get('PORTFOLIO_STORE_TTL', os.environ.get('PORTFOLIO_STORE_TTL', '604800')))  # 7 days unused
+# Fraction of writes that also delete expired entries (pruning scans the whole store)
+PORTFOLIO_STORE_PRUNE_RATE = float(config.get('PORTFOLIO_STORE_PRUNE_RATE', os.environ.get('PORTFOLIO_STORE_PRUNE_RATE', '0.01')))
+
 # Gemini API Configuration
 GEMINI_API_KEY = config.get('GEMINI_API_KEY', os.environ.get('GEMINI_API_KEY', ''))
 
+# PDF text extraction - PDFs with at least PDF_PARALLEL_MIN_PAGES pages are split
+# across a pool of PDF_EXTRACT_WORKERS processes (1 disables the pool)
+PDF_EXTRACT_WORKERS = int(config.get('PDF_EXTRACT_WORKERS', os.environ.get('PDF_EXTRACT_WORKERS', str(min(4, os.cpu_count() or 1)))))
+PDF_PARALLEL_MIN_PAGES = int(config.get('PDF_PARALLEL_MIN_PAGES', os.environ.get('PDF_PARALLEL_MIN_PAGES', '8')))
+# Extraction budget - only the first PDF_MAX_PAGES pages are read and extraction
+# stops once PDF_MAX_CHARS characters were collected (0 disables either limit)
+PDF_MAX_PAGES = int(config.get('PDF_MAX_PAGES', os.environ.get('PDF_MAX_PAGES', '30')))
+PDF_MAX_CHARS = int(config.get('PDF_MAX_CHARS', os.environ.get('PDF_MAX_CHARS', '60000')))
+# Strip repeated headers/footers, page numbers and extra whitespace from the
+# extracted text before it is sent to Gemini
+RESUME_TEXT_CLEANUP = config.get('RESUME_TEXT_CLEANUP', os.environ.get('RESUME_TEXT_CLEANUP', 'True')) == 'True'
+
+# LLM used for resume extraction. core.llm_backends.FakeBackend answers locally
+# (no key or quota needed) with FAKE_LLM_LATENCY seconds of log-normally
+# distributed delay and a FAKE_LLM_ERROR_RATE fraction of simulated quota errors
+LLM_BACKEND = config.get('LLM_BACKEND', os.environ.get('LLM_BACKEND', 'core.llm_backends.GeminiBackend'))
+FAKE_LLM_LATENCY = float(config.get('FAKE_LLM_LATENCY', os.environ.get('FAKE_LLM_LATENCY', '1.5')))
+FAKE_LLM_LATENCY_SIGMA = float(config.get('FAKE_LLM_LATENCY_SIGMA', os.environ.get('FAKE_LLM_LATENCY_SIGMA', '0.4')))
+FAKE_LLM_ERROR_RATE = float(config.get('FAKE_LLM_ERROR_RATE', os.environ.get('FAKE_LLM_ERROR_RATE', '0')))
+FAKE_LLM_RESPONSE_FILE = config.get('FAKE_LLM_RESPONSE_FILE', os.environ.get('FAKE_LLM_RESPONSE_FILE', ''))
+FAKE_LLM_SEED = config.get('FAKE_LLM_SEED', os.environ.get('FAKE_LLM_SEED')) or None
+
+# Gemini clients are kept per API key so their connections are reused;
+# at most GEMINI_CLIENT_POOL_SIZE keys, dropped after IDLE_TIMEOUT seconds unused
+GEMINI_CLIENT_POOL_SIZE = int(config.get('GEMINI_CLIENT_POOL_SIZE', os.environ.get('GEMINI_CLIENT_POOL_SIZE', '32')))
+GEMINI_CLIENT_IDLE_TIMEOUT = int(config.get('GEMINI_CLIENT_IDLE_TIMEOUT', os.environ.get('GEMINI_CLIENT_IDLE_TIMEOUT', '600')))
+
+# Resumes of at least RESUME_SECTIONED_MIN_CHARS characters are split into
+# sections (profile, experience, projects, education) extracted concurrently
+RESUME_SECTIONED_EXTRACTION = config.get('RESUME_SECTIONED_EXTRACTION', os.environ.get('RESUME_SECTIONED_EXTRACTION', 'False')) == 'True'
+RESUME_SECTIONED_MIN_CHARS = int(config.get('RESUME_SECTIONED_MIN_CHARS', os.environ.get('RESUME_SECTIONED_MIN_CHARS', '6000')))
+
+# Gemini rate limiting, shared by all processes through the database: requests
+# per minute per API key (the site's own key vs. user keys), how long a request
+# may wait for its turn, how long one request may spend in total sleeping between
+# retries, and how many quota errors in a row open the circuit breaker (failing
+# fast for GEMINI_BREAKER_COOLDOWN seconds, doubling after that)
+GEMINI_SYSTEM_KEY_RPM = int(config.get('GEMINI_SYSTEM_KEY_RPM', os.environ.get('GEMINI_SYSTEM_KEY_RPM', '15')))
+GEMINI_USER_KEY_RPM = int(config.get('GEMINI_USER_KEY_RPM', os.environ.get('GEMINI_USER_KEY_RPM', '10')))
+GEMINI_RATE_LIMIT_WAIT = float(config.get('GEMINI_RATE_LIMIT_WAIT', os.environ.get('GEMINI_RATE_LIMIT_WAIT', '20')))
+GEMINI_MAX_RETRIES = int(config.get('GEMINI_MAX_RETRIES', os.environ.get('GEMINI_MAX_RETRIES', '3')))
+GEMINI_RETRY_BUDGET = float(config.get('GEMINI_RETRY_BUDGET', os.environ.get('GEMINI_RETRY_BUDGET', '60')))
+GEMINI_BREAKER_THRESHOLD = int(config.get('GEMINI_BREAKER_THRESHOLD', os.environ.get('GEMINI_BREAKER_THRESHOLD', '3')))
+GEMINI_BREAKER_COOLDOWN = int(config.get('GEMINI_BREAKER_COOLDOWN', os.environ.get('GEMINI_BREAKER_COOLDOWN', '30')))
+
+# Extraction cache - reuse Gemini results for resumes that were already processed
+EXTRACTION_CACHE_ENABLED = config.get('EXTRACTION_CACHE_ENABLED', os.environ.get('EXTRACTION_CACHE_ENABLED', 'True')) == 'True'
+EXTRACTION_CACHE_TTL = int(config.get('EXTRACTION_CACHE_TTL', os.environ.get('EXTRACTION_CACHE_TTL', '604800')))  # 7 days
+EXTRACTION_CACHE_MAX_ENTRIES = int(config.get('EXTRACTION_CACHE_MAX_ENTRIES', os.environ.get('EXTRACTION_CACHE_MAX_ENTRIES', '1000')))
+
+# Resume processing queue - when enabled, uploads are processed by `manage.py run_worker`
+# instead of inside the request (keep disabled on Vercel, which has no worker process)
+RESUME_PROCESSING_ASYNC = config.get('RESUME_PROCESSING_ASYNC', os.environ.get('RESUME_PROCESSING_ASYNC', 'False')) == 'True'
+RESUME_JOB_TIMEOUT = int(config.get('RESUME_JOB_TIMEOUT', os.environ.get('RESUME_JOB_TIMEOUT', '300')))  # seconds before a stuck job is retried
+RESUME_JOB_MAX_ATTEMPTS = int(config.get('RESUME_JOB_MAX_ATTEMPTS', os.environ.get('RESUME_JOB_MAX_ATTEMPTS', '3')))
+# By default the progress page polls job_status. With this enabled it follows the job over
+# server-sent events instead, and each open page holds a server worker for up to 25s at a
+# time, so only turn it on behind an async or threaded server (e.g. gunicorn with gthread or gevent workers)
+RESUME_JOB_EVENTS_ENABLED = config.get('RESUME_JOB_EVENTS_ENABLED', os.environ.get('RESUME_JOB_EVENTS_ENABLED', 'False')) == 'True'
+
+# Start-up warm-up (core.warmup): import WARMUP_IMPORTS, connect to the database,
+# compile templates and create the Gemini client. Long-lived servers start it once
+# the first response has gone out (in a background thread unless WARMUP_IN_BACKGROUND
+# is False); `run_worker` warms up before taking jobs. Off by default on Vercel,
+# where it would only compete with the cold start's first request.
+# /readyz answers 503 until it has finished
+WARMUP_ENABLED = config.get('WARMUP_ENABLED', os.environ.get('WARMUP_ENABLED', 'False' if os.environ.get('VERCEL') else 'True')) == 'True'
+WARMUP_IN_BACKGROUND = config.get('WARMUP_IN_BACKGROUND', os.environ.get('WARMUP_IN_BACKGROUND', 'True')) == 'True'
+warmup_imports_str = config.get('WARMUP_IMPORTS', os.environ.get('WARMUP_IMPORTS', 'pypdf,google.generativeai'))
+WARMUP_IMPORTS = [module.strip() for module in warmup_imports_str.split(',') if module.strip()]
+
 # Admin Access
 # Parse comma-separated string into a list
 admin_emails_str = config.get('ADMIN_EMAILS', os.environ.get('ADMIN_EMAILS', ''))
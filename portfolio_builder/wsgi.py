@@ -15,6 +15,14 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'portfolio_builder.settings')
 
 application = get_wsgi_application()
 
+# Warm up (heavy imports, DB connection, templates, Gemini client) once the
+# first response has gone out; /readyz reports when this has finished
+try:
+    from core.warmup import start_warmup_after_first_response
+    start_warmup_after_first_response()
+except Exception as e:
+    print(f"Error scheduling warm-up: {e}")
+
 # Vercel requires the variable 'app'
 app = application
 